@@ -0,0 +1,340 @@
+"""Timings for the game's hot paths. Run with `python bench.py`.
+
+The window parts run on a real (withdrawn) Tk root when there's a display, or a fake
+root that just swallows the widget calls when there isn't, so it also works in CI.
+Results can be written out as JSON and compared against an earlier run:
+
+    python bench.py --output baseline.json
+    python bench.py --baseline baseline.json
+
+`--generation` and `--startup` run their own separate timings instead.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+import main
+from main import Board, Minesweeper
+
+# name, width, height, mines
+BOARDS = [
+    ("Beginner",      9,    9,     10),
+    ("Intermediate", 16,   16,     40),
+    ("Expert",       30,   16,     99),
+    ("100x100",     100,  100,   1500),
+    ("300x300",     300,  300,  13500),
+    ("1000x1000",  1000, 1000, 150000),
+]
+DENSITIES = [0.12, 0.2, 0.5, 0.9]  # fraction of the board that's mines, for --generation
+REGRESSION = 1.25  # slower than baseline by more than this counts as a regression
+
+
+# ---- FAKE TK
+class FakeWidget:
+    """Stands in for any tk widget when there's no display. Every call is a no-op."""
+    item_ids = itertools.count(1)
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("create_"):
+            return lambda *args, **kwargs: next(self.item_ids)
+        return lambda *args, **kwargs: None
+
+    def winfo_rgb(self, color):
+        value = int(color[1:], 16)
+        return (value >> 16) * 257, (value >> 8 & 0xff) * 257, (value & 0xff) * 257
+
+    def winfo_width(self):
+        return 0
+    winfo_height = winfo_screenwidth = winfo_screenheight = winfo_width
+
+    def after(self, ms, func=None, *args):
+        return f"after#{next(self.item_ids)}"  # never actually runs
+
+
+class FakeVar:
+    def __init__(self, master=None, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def make_root():
+    """Returns (root, kind). Uses a real Tk root if there's a display, otherwise fakes tkinter in main."""
+    main.load_tk()
+    try:
+        root = main.tk.Tk()
+        root.withdraw()
+        return root, "tk"
+    except main.tk.TclError:
+        main.tk = types.SimpleNamespace(
+            Tk=FakeWidget, Toplevel=FakeWidget, Frame=FakeWidget, Label=FakeWidget, Button=FakeWidget,
+            Canvas=FakeWidget, Checkbutton=FakeWidget, Entry=FakeWidget, PhotoImage=FakeWidget, BooleanVar=FakeVar, TclError=main.tk.TclError)
+        return FakeWidget(), "fake"
+
+
+# ---- BENCHMARKS
+# each one takes (game, width, height, mines), does its untimed setup, and returns the
+# function to time. game already has a fresh board with nothing placed
+
+def new_game(game, width, height, mines, seed=1):
+    game.width, game.height, game.mines_count = width, height, mines
+    game.board = Board(width, height, mines, seed=seed)
+    game.solver = main.Solver(game.board)
+    game.first_click = True
+    game.board_locked = False
+    game.fading.clear()
+    game.wave.clear()
+    clear_widgets(game)  # cheap now, the canvas starts out without any cell items
+    game.create_widgets()
+    return game.board
+
+
+def clear_widgets(game):
+    if game.canvas is not None:
+        game.canvas.destroy()
+        game.info_frame.destroy()
+        game.canvas = None
+        game.cells = {}
+
+
+def opened_game(game, width, height, mines):
+    # a game after its first click in the middle
+    board = new_game(game, width, height, mines)
+    board.click(height // 2, width // 2)
+    game.first_click = False
+    game.game_active = True
+    return board
+
+
+def bench_place_mines(game, width, height, mines):
+    new_game(game, width, height, mines)
+    return lambda: game.place_mines(height // 2, width // 2)
+
+
+def bench_reveal_single(game, width, height, mines):
+    # a lone number, the cheapest reveal there is
+    board = opened_game(game, width, height, mines)
+    index = next(i for i in range(board.size) if not board.revealed[i] and not board.mines[i] and board.counts[i])
+    return lambda: game.reveal_cell(*divmod(index, width))
+
+
+def bench_reveal_first_click(game, width, height, mines):
+    board = new_game(game, width, height, mines)
+    board.place_mines(height // 2, width // 2)
+    return lambda: game.reveal_cell(height // 2, width // 2)
+
+
+def bench_reveal_whole_board(game, width, height, mines):
+    # no mines at all, so one click floods everything
+    board = new_game(game, width, height, 0)
+    board.place_mines(0, 0)
+    return lambda: game.reveal_cell(0, 0)
+
+
+def satisfied_number(board):
+    # a revealed number with hidden safe neighbours, with all its mines flagged so it can be chorded
+    for index in range(board.size):
+        if board.revealed[index] and board.counts[index]:
+            around = board.neighbours(index)
+            if any(not board.revealed[n] and not board.mines[n] for n in around):
+                for n in around:
+                    if board.mines[n] and not board.flags[n]:
+                        board.toggle_flag(*divmod(n, board.width))
+                return divmod(index, board.width)
+    return None
+
+
+def bench_chord(game, width, height, mines):
+    board = opened_game(game, width, height, mines)
+    cell = satisfied_number(board)
+    return lambda: cell and game.chord_or_show_temp_blanks(*cell)
+
+
+def bench_adjacent_status(game, width, height, mines):
+    board = opened_game(game, width, height, mines)
+    cell = satisfied_number(board)
+    return lambda: cell and game.update_adjacent_cells_status(*cell)
+
+
+def bench_check_win(game, width, height, mines):
+    opened_game(game, width, height, mines)
+    return game.check_win
+
+
+def bench_endgame(game, width, height, mines):
+    # the loss path after the first click, up to where the loss screen would show
+    board = opened_game(game, width, height, mines)
+    board.lost, board.exploded = True, board.mine_indices()[0]
+    return game.reveal_board
+
+
+def bench_three_bv(game, width, height, mines):
+    board = opened_game(game, width, height, mines)
+    return board.three_bv
+
+
+def bench_create_widgets(game, width, height, mines):
+    new_game(game, width, height, mines)
+    clear_widgets(game)
+    return game.create_widgets
+
+
+BENCHMARKS = [
+    ("place_mines",          bench_place_mines),
+    ("reveal_cell/single",   bench_reveal_single),
+    ("reveal_cell/first",    bench_reveal_first_click),
+    ("reveal_cell/whole",    bench_reveal_whole_board),
+    ("chord",                bench_chord),
+    ("update_adjacent",      bench_adjacent_status),
+    ("check_win",            bench_check_win),
+    ("endgame",              bench_endgame),
+    ("three_bv",             bench_three_bv),
+    ("create_widgets",       bench_create_widgets),
+]
+
+
+def run(game, boards, names, budget):
+    """Times every benchmark on every board. Returns {"board/benchmark": {"best": s, "median": s}}."""
+    results = {}
+    for board_name, width, height, mines in boards:
+        for name, setup in BENCHMARKS:
+            if names and name not in names:
+                continue
+            # budget counts setup time too, otherwise fast calls on huge boards spend ages in setup
+            times, deadline = [], time.perf_counter() + budget
+            while len(times) < 3 or (time.perf_counter() < deadline and len(times) < 200):
+                func = setup(game, width, height, mines)
+                start = time.perf_counter()
+                func()
+                times.append(time.perf_counter() - start)
+            key = f"{board_name}/{name}"
+            results[key] = {"best": min(times), "median": statistics.median(times), "runs": len(times)}
+            print(f"{key:<36}{min(times) * 1000:>12.3f}ms best{statistics.median(times) * 1000:>12.3f}ms median", flush=True)
+    return results
+
+
+def compare(results, baseline_path):
+    """Prints each result against the baseline. Returns the number of regressions."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)["results"]
+    regressions = 0
+    print(f"\ncompared to {baseline_path} (median, >{REGRESSION}x slower is a regression)")
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result["median"] / baseline[key]["median"] if baseline[key]["median"] else 1.0
+        flag = ""
+        if ratio > REGRESSION:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:<36}{ratio:>8.2f}x{flag}")
+    return regressions
+
+
+def bench_generation():
+    print(f"{'board':<14}{'density':>8}{'mines':>10}{'place_mines':>14}")
+    for name, width, height, _ in BOARDS:
+        size = width * height
+        repeat = 20 if size < 10_000 else 3
+        for density in DENSITIES:
+            mines = min(int(size * density), size - 9)
+            seeds = iter(range(repeat))
+
+            def generate():
+                board = Board(width, height, mines, seed=next(seeds))
+                board.place_mines(height // 2, width // 2)
+
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                generate()
+                best = min(best, time.perf_counter() - start)
+            print(f"{name:<14}{density:>8.2f}{mines:>10}{best * 1000:>12.2f}ms")
+
+
+def bench_startup(root, boards, repeat):
+    # what a player waits for: importing main, then menu -> board -> first click opened.
+    # runs in a scratch folder, since a first click writes a save file and a replay
+    code = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+    here = os.path.dirname(os.path.abspath(__file__))
+    imports = [float(subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True).stdout)
+               for _ in range(repeat)]
+    print(f"import main, no window: {min(imports) * 1000:.2f}ms best")
+    print(f"{'board':<14}{'menu':>10}{'start_game':>12}{'first click':>13}{'total':>10}")
+    scratch, cwd = tempfile.mkdtemp(), os.getcwd()
+    os.chdir(scratch)
+    try:
+        for name, width, height, mines in boards:
+            best = None
+            for _ in range(repeat):
+                window = main.tk.Toplevel(root)
+                start = time.perf_counter()
+                game = Minesweeper(window)
+                window.update()
+                menu = time.perf_counter()
+                game.start_game(width, height, mines, seed=1)
+                window.update()
+                board = time.perf_counter()
+                game.cell_click(height // 2, width // 2, None)
+                window.update()
+                clicked = time.perf_counter()
+                game.drop_snapshot()
+                game.close_replay()
+                game.pool.close()
+                window.destroy()
+                times = (menu - start, board - menu, clicked - board)
+                if best is None or sum(times) < sum(best):
+                    best = times
+            print(f"{name:<14}" + "".join(f"{t * 1000:>{w}.2f}ms" for t, w in zip(best, (8, 10, 11))) + f"{sum(best) * 1000:>8.2f}ms", flush=True)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch)
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the game's hot paths.")
+    parser.add_argument("--boards", nargs="+", choices=[b[0] for b in BOARDS], help="only these boards (default: all)")
+    parser.add_argument("--only", nargs="+", choices=[b[0] for b in BENCHMARKS], help="only these benchmarks (default: all)")
+    parser.add_argument("--budget", type=float, default=0.5, help="seconds to spend per benchmark, at least 3 runs")
+    parser.add_argument("--output", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --output to compare against, exits 1 on regressions")
+    parser.add_argument("--generation", action="store_true", help="just time mine placement across sizes and densities")
+    parser.add_argument("--startup", action="store_true", help="just time import and menu to first click on each board")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per board for --startup, the best one is shown")
+    args = parser.parse_args(argv)
+    if args.generation:
+        return bench_generation()
+
+    root, root_kind = make_root()
+    print(f"tk: {root_kind}")
+    boards = [b for b in BOARDS if not args.boards or b[0] in args.boards]
+    if args.startup:
+        return bench_startup(root, boards, args.repeat)
+    game = Minesweeper(root)
+    results = run(game, boards, args.only, args.budget)
+    game.pool.close()
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"python": platform.python_version(), "tk": root_kind, "time": time.time(), "results": results}, file, indent=2)
+    if args.baseline and compare(results, args.baseline):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_bench()
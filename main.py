@@ -1,9 +1,21 @@
-from   tkinter import messagebox
-import tkinter as     tk
 import random
+import os
+import re
 import struct
+import bisect
 import math
 import time
+import sys
+import zlib
+import mmap
+import stat
+import argparse
+from   collections import deque, OrderedDict
+from   operator    import add
+# tkinter (see load_tk), asyncio, multiprocessing and json are imported where they're used,
+# so headless commands and pool workers start without loading any of them
+
+tk = messagebox = None  # set by load_tk once there's a window to make
 
 CELL_SIZE        = 36         # px. scales well with font rn
 BG_COLOR         = "#222222"  # darker gray
@@ -12,23 +24,1431 @@ CLICKED_COLOR    = "#222222"  # clicked/empty spaces background
 NUMBER_COLORS    = "#e3e3e3"  # white for numbers
 TEMP_BLANK_COLOR = "#aaaaaa"  # temporary blank color for visualization
 IMPOSSIBLE_COLOR = "#503333"  # bright red for impossible moves
+HINT_COLOR       = "#6f9e5b"  # green for a cell the solver knows is safe
+ODDS_MINE_COLOR  = "#a8322b"  # red end of the mine probability overlay, HINT_COLOR is the safe end
+
+FRAME_MS               = 25    # reveal animation tick, ~40fps
+FADE_FRAMES            = 20    # frames a revealed cell takes to fade to CLICKED_COLOR
+NUMBER_FRAME           = 4     # frame the number shows up on (~100ms in)
+REVEAL_ANIMATION_LIMIT = 2000  # openings bigger than this skip the fade and draw straight away
+ENDGAME_WAVE           = True  # on a loss, open the board in a wave out from the mine that was hit
+WAVE_FRAMES            = 30    # frames the whole wave takes, however big the board
+
+RACE_BOARDS = 8  # most boards a race can have
+
+MODES = [
+    # name       width height mines
+    ("Beginner",     9,  9,  10),
+    ("Intermediate", 16, 16, 40),
+    ("Expert",       30, 16, 99)
+    ]
+
+CHUNK_SIZE    = 32    # cells along each side of an endless mode chunk
+CHUNK_DENSITY = 0.16  # fraction of every chunk that's mines
+CHUNK_MIN_DENSITY = 0.12  # much sparser and one opening can run on for good (0.1 opens ~85k cells)
+CHUNK_CACHE   = 64    # chunks kept built, the least recently used ones get packed away
+VIEW_COLS     = 30    # endless mode window, in cells
+VIEW_ROWS     = 16
+SCROLL_STEP   = 4     # cells moved per arrow key press
+
+NO_GUESS_ATTEMPTS = 5000  # boards tried before giving up on a no-guess layout
+POOL_FILE         = "minesweeper.pool"
+POOL_TARGET       = 8     # ready no-guess boards kept per difficulty
+POOL_POLL_MS      = 250
+
+REPLAY_DIR   = "replays"
+REPLAY_MAGIC = b"MSR2"  # MSR1 files (no start cell in the header) still play back
+REPLAY_CLICK, REPLAY_CHORD, REPLAY_FLAG, REPLAY_END = range(4)  # event kinds
+
+SAVE_FILE   = "minesweeper.save"
+SAVE_MAGIC  = b"MSS1"
+AUTOSAVE_MS = 3000  # how often the changed parts of an in-progress game get written out
+
+SERVER_PORT      = 8765
+SERVER_MAX_CELLS = 50 * 50  # biggest board a client can ask for, moves block the event loop (~7ms to open a whole 50x50)
+
+DEBUG_REFRESH_MS = 250  # how often the debug overlay updates
+
+WINS_FILE  = "minesweeper.wins"
+TOP_SCORES = 10  # best times kept per mode in the index, the window shows 5
+
+
+
+# ---- ENGINE
+ZERO_CELLS = bytes([1] + [0] * 255)  # translate table, count -> 1 if it's 0
+ZERO_RUN   = re.compile(b"\1+")
+
+
+def neighbourhood_sums(cells, width, height):
+    """Sum of every cell's 3x3 block (itself included), for a flat grid of small numbers.
+
+    Sums each row with its left/right neighbours, then each of those with the rows
+    above and below, so it's all done in C a row at a time.
+    """
+    row_sums = []
+    for start in range(0, width * height, width):
+        row = cells[start:start + width]
+        row_sums.append(bytes(map(add, map(add, b"\0" + row[:-1], row), row[1:] + b"\0")))
+    blank = bytes(width)
+    sums = bytearray()
+    for r, middle in enumerate(row_sums):
+        above = row_sums[r-1] if r > 0 else blank
+        below = row_sums[r+1] if r + 1 < height else blank
+        sums += bytes(map(add, map(add, above, middle), below))
+    return sums
+
+
+class Board:
+    """Headless board state. No tkinter in here, so it can be run and tested without a display.
+
+    Cells are stored flat in bytearrays, index = row * width + col.
+    """
+    def __init__(self, width, height, mines_count, seed=None, no_guess=False):
+        # the first click clears up to a 3x3 area, so the mines have to fit around the biggest one
+        if width < 1 or height < 1:
+            raise ValueError(f"board must be at least 1x1, got {width}x{height}")
+        max_mines = width * height - min(3, width) * min(3, height)
+        if not 0 <= mines_count <= max_mines:
+            raise ValueError(f"a {width}x{height} board fits 0 to {max_mines} mines, got {mines_count}")
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed        = seed  # same seed + same first click = same board
+        self.no_guess    = no_guess  # only lay out mines the solver can clear without guessing
+        self.width       = width
+        self.height      = height
+        self.mines_count = mines_count
+        self.size        = width * height
+        self.mines       = bytearray(self.size)  # 1 if the cell is a mine
+        self.counts      = bytearray(self.size)  # adjacent mine count, filled once by place_mines
+        self.revealed    = bytearray(self.size)
+        self.flags       = bytearray(self.size)
+        self.flag_counts = bytearray(self.size)  # adjacent flag count, kept up to date by toggle_flag
+        self.revealed_count = 0
+        self.flag_count  = 0
+        self.placed      = False
+        self.start       = None  # index of the cell the mines were placed around
+        self.lost        = False
+        self.exploded    = None  # index of the mine that ended the game
+        self.watchers    = []  # called with the indices of cells that got revealed or (un)flagged
+
+    def watch(self, callback):
+        self.watchers.append(callback)
+
+    def notify(self, indices):
+        for callback in self.watchers:
+            callback(indices)
+
+    def index(self, row, col):
+        return row * self.width + col
+
+    def neighbours(self, index):
+        # the (up to) 8 cells around index, not including itself
+        width = self.width
+        row, col = divmod(index, width)
+        if 0 < row < self.height - 1 and 0 < col < width - 1:  # most cells, no clipping needed
+            above, below = index - width, index + width
+            return [above - 1, above, above + 1, index - 1, index + 1, below - 1, below, below + 1]
+        cols = range(max(0, col-1), min(width, col+2))
+        return [r * width + c for r in range(max(0, row-1), min(self.height, row+2)) for c in cols if r * width + c != index]
 
+    def place_mines(self, start_row, start_col):
+        # draw exactly mines_count cells out of everything outside the (clipped) safe zone,
+        # by sampling ranks among the candidates and stepping them over the safe cells
+        if self.no_guess:
+            # swaps in the first seed (drawn from ours) that gives a guess free board,
+            # so the plain seed is still all it takes to rebuild it
+            self.seed = find_no_guess_seed(self.width, self.height, self.mines_count, start_row, start_col, self.seed)
+        width = self.width
+        safe_zone = sorted(r * width + c for r in range(max(0, start_row-1), min(self.height, start_row+2))
+                                         for c in range(max(0, start_col-1), min(width, start_col+2)))
+        candidates = self.size - len(safe_zone)
+        if self.mines_count > candidates:
+            raise ValueError(f"can't fit {self.mines_count} mines outside the safe zone, only {candidates} cells")
+        mines = self.mines
+        if self.mines_count * 2 > candidates:
+            # dense boards: start full and sample the empty cells instead, it's fewer draws
+            mines[:] = b"\1" * self.size
+            for index in safe_zone:
+                mines[index] = 0
+            picks, value = candidates - self.mines_count, 0
+        else:
+            picks, value = self.mines_count, 1
+        for index in random.Random(self.seed).sample(range(candidates), picks):
+            for safe in safe_zone:
+                if index < safe:
+                    break
+                index += 1
+            mines[index] = value
+        self.compute_counts()
+        self.placed = True
+        self.start = start_row * width + start_col
+
+    def compute_counts(self):
+        # done once per board, everything else just reads self.counts.
+        # counts a mine cell's own mine too, which nothing reads
+        self.counts = neighbourhood_sums(self.mines, self.width, self.height)
+
+    def three_bv(self):
+        """The fewest left clicks that clear the board (3BV): one per opening, plus one per
+        number that isn't on the edge of an opening. Needs the mines placed."""
+        width = self.width
+        zeros = self.counts.translate(ZERO_CELLS)  # mines count themselves, so never 0
+        # openings: number the runs of zeros row by row, and join each run to the runs in
+        # the row above it touches (diagonals too) in a union find over the run numbers
+        parent, above = [], []  # above: (start, end, run) for the row before
+
+        def root(run):
+            while parent[run] != run:
+                parent[run] = parent[parent[run]]
+                run = parent[run]
+            return run
+
+        for start in range(0, self.size, width):
+            row, first = [], 0
+            for match in ZERO_RUN.finditer(zeros, start, start + width):
+                run_start, run_end, run = match.start() - start, match.end() - start, len(parent)
+                parent.append(run)
+                while first < len(above) and above[first][1] < run_start:
+                    first += 1  # ends too far left for this run or any after it
+                for other_start, _, other in above[first:]:
+                    if other_start > run_end:
+                        break
+                    parent[root(other)] = root(run)
+                row.append((run_start, run_end, run))
+            above = row
+        openings = sum(1 for run, up in enumerate(parent) if run == up)
+        # a cell with no zero in its 3x3 isn't a zero and isn't opened by one
+        near_zero = neighbourhood_sums(zeros, width, self.height)
+        lone_numbers = sum(1 for mine, near in zip(self.mines, near_zero) if not mine and not near)
+        return openings + lone_numbers
+
+    def mine_indices(self):
+        return [i for i, mine in enumerate(self.mines) if mine]
+
+    def adjacent_mines(self, row, col):
+        return self.counts[row * self.width + col]
+
+    def adjacent_flags(self, row, col):
+        return self.flag_counts[row * self.width + col]
+
+    def is_impossible(self, index):
+        # more flags around a number than it has mines
+        return self.flag_counts[index] > self.counts[index]
+
+    def reveal(self, row, col):
+        """Reveals a cell (flood filling through zeros) and returns the indices that were opened."""
+        start = row * self.width + col
+        revealed, flags, mines, counts = self.revealed, self.flags, self.mines, self.counts
+        if revealed[start] or flags[start]:
+            return []
+        revealed[start] = 1  # marked when queued so every cell is only queued once
+        queue = deque([start])
+        opened = []
+        while queue:
+            index = queue.popleft()
+            opened.append(index)
+            if counts[index] == 0 and not mines[index]:
+                for n in self.neighbours(index):
+                    if not revealed[n] and not flags[n]:
+                        revealed[n] = 1
+                        queue.append(n)
+        self.revealed_count += len(opened)
+        self.notify(opened)
+        return opened
+
+    def click(self, row, col):
+        """Left click on a hidden cell. Returns the opened indices, sets self.lost on a mine."""
+        index = row * self.width + col
+        if self.lost or self.flags[index] or self.revealed[index]:
+            return []
+        if not self.placed:
+            self.place_mines(row, col)
+        if self.mines[index]:
+            self.lost = True
+            self.exploded = index
+            return []
+        return self.reveal(row, col)
+
+    def can_chord(self, row, col):
+        index = row * self.width + col
+        return bool(self.revealed[index]) and self.counts[index] == self.flag_counts[index]
+
+    def chord(self, row, col):
+        """Reveals every unflagged neighbour of a satisfied number. Returns the opened indices."""
+        if self.lost or not self.can_chord(row, col):
+            return []
+        hidden = [n for n in self.neighbours(row * self.width + col) if not self.flags[n] and not self.revealed[n]]
+        mines = [n for n in hidden if self.mines[n]]
+        if mines:
+            self.lost = True
+            self.exploded = mines[0]
+            return []
+        opened = []
+        for n in hidden:
+            opened.extend(self.reveal(*divmod(n, self.width)))
+        return opened
+
+    def reveal_all(self):
+        """Opens every hidden cell that isn't a mine or flagged, no flood fill. Returns the indices opened."""
+        revealed, mines, flags = self.revealed, self.mines, self.flags
+        opened = [i for i in range(self.size) if not revealed[i] and not mines[i] and not flags[i]]
+        for index in opened:
+            revealed[index] = 1
+        self.revealed_count += len(opened)
+        self.notify(opened)
+        return opened
+
+    def restore(self, mines, revealed, flags):
+        """Puts a saved game back, from its mine layout and what was revealed and flagged."""
+        self.mines, self.revealed, self.flags = mines, revealed, flags
+        self.compute_counts()
+        self.placed = True
+        self.revealed_count = revealed.count(1)
+        self.flag_count = flags.count(1)
+        for index in (i for i, flagged in enumerate(flags) if flagged):
+            for n in self.neighbours(index):
+                self.flag_counts[n] += 1
+
+    def toggle_flag(self, row, col):
+        """Flags/unflags a hidden cell. Returns the new flag state, or None if it can't be flagged."""
+        index = row * self.width + col
+        if not self.placed or self.revealed[index]:
+            return None
+        flagged = not self.flags[index]
+        self.flags[index] = flagged
+        step = 1 if flagged else -1
+        self.flag_count += step
+        flag_counts = self.flag_counts
+        for n in self.neighbours(index):  # only the 8 around it can see this flag
+            flag_counts[n] += step
+        self.notify([index])
+        return flagged
 
+    def check_win(self):
+        # if all non-mine cells revealed
+        return not self.lost and self.revealed_count == self.size - self.mines_count
+
+
+class ChunkedBoard:
+    """Endless board, split into CHUNK_SIZE squares that only get built once something looks at them.
+
+    A chunk's mines come from the board seed and the chunk's position, so it can be thrown
+    away and rebuilt exactly the same. The player's state can't be, so when a chunk drops out
+    of the `cache` most recently used ones that gets zlib packed into self.deltas (a few dozen
+    bytes for a typical chunk) and the rest is freed. Cells are (row, col) anywhere, and the
+    3x3 around (0, 0) never has mines so there's always a safe place to start.
+    """
+    HIDDEN, REVEALED, FLAGGED = range(3)
+
+    def __init__(self, seed=None, density=CHUNK_DENSITY, cache=CHUNK_CACHE):
+        if not CHUNK_MIN_DENSITY <= density < 1:
+            raise ValueError(f"density has to be at least {CHUNK_MIN_DENSITY} and below 1, got {density}")
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed        = seed
+        self.density     = density
+        self.cache       = cache
+        self.chunks      = OrderedDict()  # (chunk row, chunk col) -> (mines, counts, state), least recently used first
+        self.deltas      = {}    # (chunk row, chunk col) -> packed state of an evicted chunk
+        self.revealed_count = 0
+        self.flag_count  = 0
+        self.lost        = False
+        self.exploded    = None  # (row, col) of the mine that ended the game
+        self.watchers    = []    # called with the (row, col)s that got revealed or (un)flagged
+
+    def watch(self, callback):
+        self.watchers.append(callback)
+
+    def notify(self, cells):
+        for callback in self.watchers:
+            callback(cells)
+
+    def layout(self, key):
+        # the same seed and chunk always give the same mines
+        area = CHUNK_SIZE * CHUNK_SIZE
+        mines = bytearray(area)
+        for index in random.Random(f"{self.seed}:{key[0]}:{key[1]}").sample(range(area), round(area * self.density)):
+            mines[index] = 1
+        for row in range(-1, 2):
+            for col in range(-1, 2):
+                (chunk_row, local_row), (chunk_col, local_col) = divmod(row, CHUNK_SIZE), divmod(col, CHUNK_SIZE)
+                if (chunk_row, chunk_col) == key:
+                    mines[local_row * CHUNK_SIZE + local_col] = 0
+        return mines
+
+    def load(self, key):
+        """Returns (mines, counts, state) for a chunk, building it if it isn't already."""
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        side = CHUNK_SIZE
+        layouts = {}
+
+        def mines_of(chunk_key):
+            if chunk_key not in layouts:
+                built = self.chunks.get(chunk_key)
+                layouts[chunk_key] = built[0] if built else self.layout(chunk_key)
+            return layouts[chunk_key]
+
+        # the chunk's mine rows with a one cell border from its neighbours, summed along each
+        # row then down three rows at a time, same as Board.compute_counts
+        row_sums = []
+        for row in range(-1, side + 1):
+            chunk_row, local = key[0] + row // side, row % side
+            start = local * side
+            padded = (mines_of((chunk_row, key[1] - 1))[start + side - 1:start + side]
+                      + mines_of((chunk_row, key[1]))[start:start + side]
+                      + mines_of((chunk_row, key[1] + 1))[start:start + 1])
+            row_sums.append(bytes(map(add, map(add, padded[:-2], padded[1:-1]), padded[2:])))
+        counts = bytearray()
+        for row in range(side):
+            counts += bytes(map(add, map(add, row_sums[row], row_sums[row + 1]), row_sums[row + 2]))
+
+        packed = self.deltas.pop(key, None)
+        state = bytearray(zlib.decompress(packed)) if packed else bytearray(side * side)
+        chunk = self.chunks[key] = (mines_of(key), counts, state)
+        while len(self.chunks) > self.cache:
+            old_key, (_, _, old_state) = self.chunks.popitem(last=False)
+            if any(old_state):  # untouched chunks rebuild from the seed alone
+                self.deltas[old_key] = zlib.compress(old_state)
+        return chunk
+
+    def cell(self, row, col):
+        """Returns (chunk, index in the chunk) for a cell, chunk being what load returns."""
+        (chunk_row, local_row), (chunk_col, local_col) = divmod(row, CHUNK_SIZE), divmod(col, CHUNK_SIZE)
+        return self.load((chunk_row, chunk_col)), local_row * CHUNK_SIZE + local_col
+
+    def state(self, row, col):
+        chunk, index = self.cell(row, col)
+        return chunk[2][index]
+
+    def adjacent_mines(self, row, col):
+        chunk, index = self.cell(row, col)
+        return chunk[1][index]
+
+    def is_mine(self, row, col):
+        chunk, index = self.cell(row, col)
+        return chunk[0][index]
+
+    def neighbours(self, row, col):
+        return [(r, c) for r in range(row - 1, row + 2) for c in range(col - 1, col + 2) if (r, c) != (row, col)]
+
+    def adjacent_flags(self, row, col):
+        return sum(self.state(r, c) == self.FLAGGED for r, c in self.neighbours(row, col))
+
+    def reveal(self, row, col):
+        """Reveals a cell, flood filling through zeros across chunks. Returns the (row, col)s opened."""
+        chunk, index = self.cell(row, col)
+        if chunk[2][index] != self.HIDDEN:
+            return []
+        chunk[2][index] = self.REVEALED  # marked when queued, like Board.reveal
+        queue = deque([(row, col)])
+        opened = []
+        while queue:
+            cell = queue.popleft()
+            opened.append(cell)
+            chunk, index = self.cell(*cell)
+            if chunk[1][index] == 0 and not chunk[0][index]:
+                for n in self.neighbours(*cell):
+                    # looked up again for every cell, a chunk can get evicted mid fill
+                    chunk, index = self.cell(*n)
+                    if chunk[2][index] == self.HIDDEN:
+                        chunk[2][index] = self.REVEALED
+                        queue.append(n)
+        self.revealed_count += len(opened)
+        self.notify(opened)
+        return opened
+
+    def click(self, row, col):
+        """Left click on a hidden cell. Returns the opened cells, sets self.lost on a mine."""
+        if self.lost or self.state(row, col) != self.HIDDEN:
+            return []
+        if self.is_mine(row, col):
+            self.lost = True
+            self.exploded = (row, col)
+            return []
+        return self.reveal(row, col)
+
+    def chord(self, row, col):
+        """Reveals every unflagged neighbour of a satisfied number. Returns the opened cells."""
+        if self.lost or self.state(row, col) != self.REVEALED or self.adjacent_flags(row, col) != self.adjacent_mines(row, col):
+            return []
+        hidden = [n for n in self.neighbours(row, col) if self.state(*n) == self.HIDDEN]
+        mines = [n for n in hidden if self.is_mine(*n)]
+        if mines:
+            self.lost = True
+            self.exploded = mines[0]
+            return []
+        opened = []
+        for n in hidden:
+            opened.extend(self.reveal(*n))
+        return opened
+
+    def toggle_flag(self, row, col):
+        """Flags/unflags a hidden cell. Returns the new flag state, or None if it can't be flagged."""
+        chunk, index = self.cell(row, col)
+        state = chunk[2]
+        if self.lost or state[index] == self.REVEALED:
+            return None
+        flagged = state[index] == self.HIDDEN
+        state[index] = self.FLAGGED if flagged else self.HIDDEN
+        self.flag_count += 1 if flagged else -1
+        self.notify([(row, col)])
+        return flagged
+
+
+# ---- SOLVER
+class Solver:
+    """Finds cells that are certainly safe or certainly mines from what the player can see.
+
+    Only looks at revealed numbers and flags (flags are trusted to be mines), never at
+    board.mines. It watches the board, so after a reveal or a flag only the numbers
+    around the cells that changed get looked at again instead of the whole board.
+    """
+    def __init__(self, board):
+        self.board = board
+        self.safe  = set()  # deduced safe, not revealed yet
+        self.found = set()  # deduced mines, not flagged yet
+        self.dirty = set()  # revealed numbers that need another look
+        self.pending = []   # cells changed since find_moves last ran
+        self.component_cache = {}  # component shape -> count_component result, see probabilities
+        board.watch(self.changed)
+        self.changed([i for i, revealed in enumerate(board.revealed) if revealed])
+
+    def changed(self, indices):
+        # only noted here and worked through in find_moves, so reveals stay cheap
+        # for as long as nobody asks for a hint
+        self.pending.extend(indices)
+
+    def absorb(self):
+        pending, self.pending = self.pending, []
+        revealed, flags = self.board.revealed, self.board.flags
+        for index in pending:
+            if revealed[index]:
+                self.safe.discard(index)
+                self.dirty.add(index)
+            if flags[index]:
+                self.found.discard(index)
+                self.safe.discard(index)  # flagged by the player, so it's trusted as a mine now
+            self.dirty.update(n for n in self.board.neighbours(index) if revealed[n])
+
+    def constraint(self, index):
+        """Returns (unknown neighbours, mines left among them) for a revealed number."""
+        board = self.board
+        unknown, mines = set(), board.counts[index]
+        for n in board.neighbours(index):
+            if board.flags[n] or n in self.found:
+                mines -= 1
+            elif not board.revealed[n] and n not in self.safe:
+                unknown.add(n)
+        return unknown, mines
+
+    def nearby_numbers(self, index):
+        # revealed cells in the 5x5 around index, the only ones that can share unknowns with it
+        board, width = self.board, self.board.width
+        row, col = divmod(index, width)
+        return [r * width + c for r in range(max(0, row-2), min(board.height, row+3))
+                              for c in range(max(0, col-2), min(width, col+3))
+                              if board.revealed[r * width + c] and r * width + c != index]
+
+    def mark(self, cells, mine):
+        for index in cells:
+            (self.found if mine else self.safe).add(index)
+        self.changed(cells)  # the numbers around these just got more information
+
+    def examine(self, index):
+        unknown, mines = self.constraint(index)
+        if not unknown:
+            return
+        # single cell rules
+        if mines == 0:
+            self.mark(unknown, mine=False)
+            return
+        if mines == len(unknown):
+            self.mark(unknown, mine=True)
+            return
+        # subset rules against the numbers around it. if this one's unknowns minus the
+        # other's hold exactly as many mines as the difference in counts, they're all mines
+        # and the other's leftovers are all safe (plain subsets are the case with no leftovers)
+        for other in self.nearby_numbers(index):
+            other_unknown, other_mines = self.constraint(other)
+            if not other_unknown or not unknown & other_unknown:
+                continue
+            only_here, only_there = unknown - other_unknown, other_unknown - unknown
+            if mines - other_mines == len(only_here):
+                self.mark(only_here, mine=True)
+                self.mark(only_there, mine=False)
+            elif other_mines - mines == len(only_there):
+                self.mark(only_there, mine=True)
+                self.mark(only_here, mine=False)
+            else:
+                continue
+            if only_here or only_there:
+                self.dirty.add(index)  # our own constraint changed, look again
+                return
+
+    def find_moves(self):
+        """Returns (safe, mines), the sets of cells that are certain and not played yet."""
+        while self.pending or self.dirty:
+            self.absorb()
+            while self.dirty:
+                self.examine(self.dirty.pop())
+        return set(self.safe), set(self.found)
+
+    def probabilities(self):
+        """Returns the exact chance of being a mine for every hidden, unflagged cell.
+
+        Every arrangement of the remaining mines that fits the visible numbers is equally
+        likely. The frontier is split into independent components that are counted on their
+        own (see count_component), and then weighted by how many ways the rest of the mines
+        can be spread over the hidden cells that no number touches.
+        """
+        safe, mines = self.find_moves()
+        board = self.board
+        remaining = board.mines_count - board.flag_count - len(mines)
+        constraints, touched = [], set()
+        for index, revealed in enumerate(board.revealed):
+            if revealed and board.counts[index]:
+                unknown, needed = self.constraint(index)
+                if unknown:
+                    constraints.append((unknown, needed))
+                    touched |= unknown
+        free = [i for i in range(board.size) if not board.revealed[i] and not board.flags[i]
+                and i not in touched and i not in safe and i not in mines]
+
+        components = []  # (cells in enumeration order, {total mines: ways}, {total mines: ways per cell})
+        for cells, component_constraints in split_components(constraints):
+            labels = {cell: label for label, cell in enumerate(cells)}
+            shape = (len(cells), tuple(sorted((tuple(sorted(labels[c] for c in unknown)), needed) for unknown, needed in component_constraints)))
+            if shape not in self.component_cache:
+                self.component_cache[shape] = count_component(*shape)
+            components.append((cells, *self.component_cache[shape]))
+
+        # ways[k] for "everything but component i", built from prefix and suffix products
+        totals = [total for _, total, _ in components]
+        prefix, suffix = [{0: 1}], [{0: 1}]
+        for total in totals:
+            prefix.append(convolve(prefix[-1], total))
+        for total in reversed(totals):
+            suffix.append(convolve(suffix[-1], total))
+        suffix.reverse()
+
+        def spread(mines_in_frontier):
+            # ways to put the rest of the mines on the untouched cells
+            rest = remaining - mines_in_frontier
+            return math.comb(len(free), rest) if 0 <= rest <= len(free) else 0
+
+        weight = sum(ways * spread(k) for k, ways in prefix[-1].items())
+        probabilities = {i: 0.0 for i in safe}
+        probabilities.update((i, 1.0) for i in mines)
+        if not weight:
+            return probabilities  # flags don't fit the numbers, nothing sensible to say
+        for i, (cells, total, per_cell) in enumerate(components):
+            others = convolve(prefix[i], suffix[i + 1])
+            # weight of each mine count k inside this component, given everything else
+            outside = {k: sum(ways * spread(k + j) for j, ways in others.items()) for k in total}
+            for label, cell in enumerate(cells):
+                probabilities[cell] = sum(counts[label] * outside[k] for k, counts in per_cell.items()) / weight
+        if free:
+            expected = sum(ways * spread(k) * (remaining - k) for k, ways in prefix[-1].items())
+            free_probability = expected / (weight * len(free))
+            probabilities.update((i, free_probability) for i in free)
+        return probabilities
+
+    def play(self):
+        """Plays every certain move on the board until there's none left. Returns how many it made."""
+        board, moves = self.board, 0
+        while not board.lost and not board.check_win():
+            safe, mines = self.find_moves()
+            if not safe and not mines:
+                break
+            for index in mines:
+                self.found.discard(index)
+                board.toggle_flag(*divmod(index, board.width))
+            for index in safe:
+                board.click(*divmod(index, board.width))
+            moves += len(safe) + len(mines)
+        return moves
+
+
+def convolve(a, b):
+    """Multiplies two {mines: ways} polynomials."""
+    result = {}
+    for i, x in a.items():
+        for j, y in b.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result
+
+
+def split_components(constraints):
+    """Groups (cells, mines) constraints that share cells, union-find style.
+
+    Yields (cells, constraints) per component, cells ordered breadth first so that
+    constraints stay open for as short a stretch as possible in count_component.
+    """
+    parent = {}
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+    for unknown, _ in constraints:
+        for cell in unknown:
+            parent.setdefault(cell, cell)
+        first = find(next(iter(unknown)))
+        for cell in unknown:
+            parent[find(cell)] = first
+    groups = {}
+    for constraint in constraints:
+        groups.setdefault(find(next(iter(constraint[0]))), []).append(constraint)
+    for group in groups.values():
+        linked = {}  # cell -> cells sharing a constraint with it
+        for unknown, _ in group:
+            for cell in unknown:
+                linked.setdefault(cell, set()).update(unknown)
+        start = min(linked)
+        order, seen, queue = [], {start}, deque([start])
+        while queue:
+            cell = queue.popleft()
+            order.append(cell)
+            for other in sorted(linked[cell] - seen):
+                seen.add(other)
+                queue.append(other)
+        yield order, group
+
+
+def count_component(size, constraints):
+    """Counts mine arrangements for one frontier component.
+
+    Cells are 0..size-1, constraints are (cell labels, mines) pairs. Returns
+    ({total mines: ways}, {total mines: [ways that cell is a mine, per cell]}).
+    Goes cell by cell keeping only the still-open constraints' remaining mine counts
+    as state, so arrangements that leave the same state are counted together
+    instead of being enumerated one by one.
+    """
+    containing = [[] for _ in range(size)]
+    last = []
+    for j, (cells, _) in enumerate(constraints):
+        for cell in cells:
+            containing[cell].append(j)
+        last.append(max(cells))
+    first = [min(cells) for cells, _ in constraints]
+    left_after = [{cell: sum(1 for other in cells if other > cell) for cell in cells} for cells, _ in constraints]
+
+    def step(state, cell, mine):
+        needs = dict(state)
+        for j in containing[cell]:
+            need = needs.get(j, constraints[j][1]) if first[j] == cell else needs[j]
+            need -= mine
+            if need < 0 or need > left_after[j][cell]:
+                return None
+            if last[j] == cell:
+                needs.pop(j, None)
+            else:
+                needs[j] = need
+        return tuple(sorted(needs.items()))
+
+    # forward[cell][state] = {mines so far: ways}
+    forward = [{(): {0: 1}}]
+    for cell in range(size):
+        layer = {}
+        for state, ways in forward[-1].items():
+            for mine in (0, 1):
+                next_state = step(state, cell, mine)
+                if next_state is None:
+                    continue
+                target = layer.setdefault(next_state, {})
+                for k, count in ways.items():
+                    target[k + mine] = target.get(k + mine, 0) + count
+        forward.append(layer)
+
+    # backward[cell][state] = {mines from here on: ways}, only for states forward can reach
+    backward = [None] * size + [{(): {0: 1}}]
+    for cell in range(size - 1, -1, -1):
+        layer = {}
+        for state in forward[cell]:
+            ways = {}
+            for mine in (0, 1):
+                next_state = step(state, cell, mine)
+                rest = backward[cell + 1].get(next_state) if next_state is not None else None
+                if rest:
+                    for k, count in rest.items():
+                        ways[k + mine] = ways.get(k + mine, 0) + count
+            if ways:
+                layer[state] = ways
+        backward[cell] = layer
+
+    total = backward[0].get((), {})
+    per_cell = {k: [0] * size for k in total}
+    for cell in range(size):
+        for state, before in forward[cell].items():
+            next_state = step(state, cell, 1)
+            after = backward[cell + 1].get(next_state) if next_state is not None else None
+            if not after:
+                continue
+            for k, count in convolve(before, after).items():
+                per_cell[k + 1][cell] += count
+    return total, per_cell
+
+
+def solvable(width, height, mines, seed, start_row, start_col):
+    """True if the solver can clear this board from the first click without guessing."""
+    board = Board(width, height, mines, seed=seed)
+    solver = Solver(board)
+    board.click(start_row, start_col)
+    solver.play()
+    return board.check_win()
+
+
+def find_no_guess_seed(width, height, mines, start_row, start_col, seed):
+    rng = random.Random(seed)
+    for _ in range(NO_GUESS_ATTEMPTS):
+        candidate = rng.randrange(2**32)
+        if solvable(width, height, mines, candidate, start_row, start_col):
+            return candidate
+    raise ValueError(f"no guess free {width}x{height} board with {mines} mines found in {NO_GUESS_ATTEMPTS} tries")
+
+
+def pool_job(job):
+    # runs in a worker process: one no-guess board with a random starting cell
+    width, height, mines, seed = job
+    rng = random.Random(seed)
+    start_row, start_col = rng.randrange(height), rng.randrange(width)
+    return job[:3], (find_no_guess_seed(width, height, mines, start_row, start_col, seed), start_row, start_col)
+
+
+class BoardPool:
+    """Ready made no-guess boards, kept in minesweeper.pool and topped up by worker processes.
+
+    A board is just (seed, start row, start col) for a given width/height/mines. Clicking
+    the start cell first on Board(width, height, mines, seed) plays out that exact board.
+    """
+    RECORD = struct.Struct('6I')  # width, height, mines, seed, start row, start col
+
+    def __init__(self, path=POOL_FILE, target=POOL_TARGET):
+        self.path     = path
+        self.target   = target
+        self.boards   = {}  # (width, height, mines) -> [(seed, start row, start col)]
+        self.pending  = []  # futures still generating
+        self.executor = None
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            for width, height, mines, *board in self.RECORD.iter_unpack(data[:len(data) - len(data) % self.RECORD.size]):
+                self.boards.setdefault((width, height, mines), []).append(tuple(board))
+        except FileNotFoundError:
+            pass
+
+    def save(self):
+        data = b"".join(self.RECORD.pack(*size, *board) for size, boards in self.boards.items() for board in boards)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, self.path)
+
+    def take(self, width, height, mines):
+        """Pops a ready board as (seed, start row, start col), or None if there isn't one."""
+        boards = self.boards.get((width, height, mines))
+        if not boards:
+            return None
+        board = boards.pop()
+        self.save()
+        return board
+
+    def refill(self, sizes):
+        """Queues up enough background jobs to bring every size back up to the target."""
+        pending = {}
+        for future in self.pending:
+            pending[future.size] = pending.get(future.size, 0) + 1
+        for size in sizes:
+            missing = self.target - len(self.boards.get(size, ())) - pending.get(size, 0)
+            for _ in range(missing):
+                if self.executor is None:
+                    # spawn, since forking a process that has Tk running isn't safe
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    self.executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+                future = self.executor.submit(pool_job, (*size, random.randrange(2**32)))
+                future.size = size
+                self.pending.append(future)
+
+    def collect(self):
+        """Moves finished jobs into the pool. Returns how many boards were added."""
+        added = 0
+        for future in [f for f in self.pending if f.done()]:
+            self.pending.remove(future)
+            if future.cancelled() or future.exception() is not None:
+                continue  # too dense to find one, nothing to add
+            size, board = future.result()
+            self.boards.setdefault(size, []).append(board)
+            added += 1
+        if added:
+            self.save()
+        return added
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# ---- REPLAYS
+# a replay is REPLAY_MAGIC, then width, height, mines, seed and the cell the mines were
+# placed around (a race board's isn't its first click) as varints, then one
+# event per input: varint(centiseconds since the last event), varint(cell index << 2 | kind).
+# most events come out at 2-3 bytes, so even long games stay tiny
+
+def encode_varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data, offset):
+    """Returns (value, offset after it). Raises IndexError if data ends mid varint."""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class ReplayWriter:
+    """Streams one game's inputs to a replay file as they happen."""
+    def __init__(self, path, board):
+        self.file    = open(path, "xb")  # never write over an older replay
+        self.board   = board
+        self.started = None
+        self.last    = 0  # centiseconds of the last event
+
+    def record(self, kind, index):
+        now = time.perf_counter()
+        if self.started is None:
+            # header goes in on the first event, after the mines are placed, since
+            # no-guess boards only settle on their seed then
+            self.started = now
+            board = self.board
+            self.file.write(REPLAY_MAGIC + b"".join(map(encode_varint, (board.width, board.height, board.mines_count, board.seed, board.start))))
+        ticks = int((now - self.started) * 100)
+        self.file.write(encode_varint(ticks - self.last) + encode_varint(index << 2 | kind))
+        self.last = ticks
+
+    def close(self):
+        if self.started is not None:
+            self.record(REPLAY_END, 0)
+        self.file.close()
+
+
+def read_replay(path):
+    """Returns ((width, height, mines, seed, start), events). events lazily yields (seconds, kind, index).
+
+    start is None for MSR1 files, whose mines went around the first click.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:4] not in (REPLAY_MAGIC, b"MSR1"):
+        raise ValueError(f"{path} isn't a replay file")
+    header, offset = [], 4
+    try:
+        for _ in range(5 if data[:4] == REPLAY_MAGIC else 4):
+            value, offset = decode_varint(data, offset)
+            header.append(value)
+    except IndexError:
+        raise ValueError(f"{path} is cut off") from None
+    if len(header) == 4:
+        header.append(None)
+
+    def events(offset=offset):
+        ticks = 0
+        try:
+            while offset < len(data):
+                delta, offset = decode_varint(data, offset)
+                packed, offset = decode_varint(data, offset)
+                ticks += delta
+                yield ticks / 100, packed & 3, packed >> 2
+        except IndexError:
+            return  # cut off mid event, the game was closed while it was being written
+    return tuple(header), events()
+
+
+def replay_game(path):
+    """Plays a replay through a headless board as fast as possible. Returns (board, seconds, inputs)."""
+    (width, height, mines, seed, start), events = read_replay(path)
+    board = Board(width, height, mines, seed=seed)
+    if start is not None:
+        board.place_mines(*divmod(start, width))
+    seconds = inputs = 0
+    for seconds, kind, index in events:
+        row, col = divmod(index, width)
+        if kind == REPLAY_CLICK:
+            board.click(row, col)
+        elif kind == REPLAY_CHORD:
+            board.chord(row, col)
+        elif kind == REPLAY_FLAG:
+            board.toggle_flag(row, col)
+        else:
+            break
+        inputs += 1
+    return board, seconds, inputs
+
+
+# ---- PROFILING
+class Tracer:
+    """Times event handlers and animation frames while the window runs (--debug / --trace).
+
+    Nothing gets wrapped unless one of those is on, so a normal game pays nothing for it.
+    The trace file is Chrome's trace event JSON, which chrome://tracing, Perfetto and
+    speedscope all open.
+    """
+    MAX_EVENTS = 1_000_000  # stop recording past this, a long session would eat memory otherwise
+
+    def __init__(self, path=None, overlay=False):
+        self.path   = path
+        self.overlay = overlay  # show the live numbers under the board
+        self.origin = time.perf_counter()
+        self.events = []
+        self.recent = {}  # name -> [calls, total seconds, worst seconds] since the overlay last read it
+        self.last_frame = None
+
+    def wrap(self, name, func, frames=False):
+        """Returns func timed under name. frames=True also records the gap between calls as frame time."""
+        def traced(*args):
+            start = time.perf_counter()
+            if frames:
+                if self.last_frame is not None and start - self.last_frame < 1:
+                    self.counter("frame ms", (start - self.last_frame) * 1000)
+                self.last_frame = start
+            try:
+                return func(*args)
+            finally:
+                self.span(name, start, time.perf_counter())
+        return traced
+
+    def span(self, name, start, end):
+        stats = self.recent.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += end - start
+        stats[2] = max(stats[2], end - start)
+        if len(self.events) < self.MAX_EVENTS:
+            self.events.append({"name": name, "ph": "X", "pid": 0, "tid": 0,
+                                "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6})
+
+    def counter(self, name, value):
+        stats = self.recent.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += value
+        stats[2] = max(stats[2], value)
+        if len(self.events) < self.MAX_EVENTS:
+            self.events.append({"name": name, "ph": "C", "pid": 0, "ts": (time.perf_counter() - self.origin) * 1e6, "args": {"value": value}})
+
+    def take_recent(self):
+        recent, self.recent = self.recent, {}
+        return recent
+
+    def save(self):
+        if self.path:
+            with open(self.path, "w") as file:
+                import json
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+
+# ---- SAVES
+TO_BITS   = bytes.maketrans(b"\0\1", b"01")
+FROM_BITS = bytes.maketrans(b"01", b"\0\1")
+
+
+def pack_bits(cells, length):
+    """Packs a bytearray of 0/1 cells into length bytes, little endian, cell i being bit i."""
+    return int(bytes(cells).translate(TO_BITS)[::-1] or b"0", 2).to_bytes(length, "little")
+
+
+def unpack_bits(data, count):
+    """Opposite of pack_bits, returns the first count cells as a bytearray of 0/1."""
+    bits = format(int.from_bytes(data, "little"), f"0{count}b")
+    return bytearray(bits[::-1][:count].encode().translate(FROM_BITS))
+
+
+class Snapshot:
+    """An in-progress game in SAVE_FILE, kept up to date while it's played.
+
+    A fixed header (see HEADER), then the mines, revealed cells and flags as bitsets of
+    whole 64-bit little endian words. Nothing in it is variable length, so the file is
+    used through an mmap: resuming just slices the bitsets out of the map, and while the
+    game goes on the board's watcher notes which words changed so flush only rewrites those.
+    """
+    HEADER = struct.Struct('<4sIIIQId')  # magic, width, height, mines, seed, clicks, elapsed seconds
+
+    def __init__(self, path, board, view=None):
+        if view is None:
+            with open(path, "r+b") as file:
+                view = mmap.mmap(file.fileno(), 0)
+        self.path   = path
+        self.board  = board
+        self.view   = view
+        self.stride = (board.size + 63) // 64 * 8  # bytes per bitset
+        self.dirty  = set()  # words of the revealed/flag bitsets changed since the last flush
+        board.watch(self.changed)
+
+    @classmethod
+    def create(cls, board, path=SAVE_FILE):
+        """Writes a whole snapshot of a board that has its mines placed, and keeps it open."""
+        stride = (board.size + 63) // 64 * 8
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(cls.HEADER.pack(SAVE_MAGIC, board.width, board.height, board.mines_count, board.seed, 0, 0.0))
+            for cells in (board.mines, board.revealed, board.flags):
+                file.write(pack_bits(cells, stride))
+        os.replace(temp_path, path)  # the old save stays whole until this one is
+        return cls(path, board)
+
+    @classmethod
+    def resume(cls, path=SAVE_FILE):
+        """Maps a saved game back in. Returns (snapshot, elapsed seconds, clicks), snapshot.board being the game."""
+        with open(path, "r+b") as file:
+            view = mmap.mmap(file.fileno(), 0)
+        try:
+            magic, width, height, mines, seed, clicks, elapsed = cls.HEADER.unpack_from(view)
+            if magic != SAVE_MAGIC:
+                raise ValueError(f"{path} isn't a saved game")
+            board = Board(width, height, mines, seed=seed)
+            stride, base = (board.size + 63) // 64 * 8, cls.HEADER.size
+            if len(view) != base + 3 * stride:
+                raise ValueError(f"{path} is {len(view)} bytes, a {width}x{height} save is {base + 3 * stride}")
+            board.restore(*(unpack_bits(view[base + i * stride:base + (i + 1) * stride], board.size) for i in range(3)))
+        except (ValueError, struct.error):
+            view.close()
+            raise
+        return cls(path, board, view), elapsed, clicks
+
+    def changed(self, indices):
+        self.dirty.update(index >> 6 for index in indices)
+
+    def flush(self, elapsed, clicks):
+        # just the changed words, the clicks and the time, never the whole board
+        view, stride, base = self.view, self.stride, self.HEADER.size
+        revealed, flags = self.board.revealed, self.board.flags
+        for word in self.dirty:
+            start, offset = word * 64, word * 8
+            view[base + stride + offset:base + stride + offset + 8] = pack_bits(revealed[start:start + 64], 8)
+            view[base + 2 * stride + offset:base + 2 * stride + offset + 8] = pack_bits(flags[start:start + 64], 8)
+        self.dirty.clear()
+        struct.pack_into('<Id', view, base - 12, clicks, elapsed)  # the header's last two fields
+
+    def close(self, elapsed, clicks):
+        self.flush(elapsed, clicks)
+        self.view.flush()
+        self.view.close()
+        self.board.watchers.remove(self.changed)
+
+    def discard(self):
+        # game's over, nothing left to resume
+        self.view.close()
+        self.board.watchers.remove(self.changed)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+# ---- SCORES
+class ScoreStore:
+    """Win records in minesweeper.wins, plus a small per-mode, per-metric top scores index next to it.
+
+    A record is a length prefixed mode string then a float time. Newer records set the top
+    bit of the length and carry the board's 3BV and the clicks it took after the time, so
+    3BV/s and click efficiency can be ranked too; older ones only count towards time.
+    The index remembers how many bytes of the wins file are already counted, so opening it
+    only has to parse records appended since, and old files without one just get indexed once.
+    """
+    INDEX_MAGIC = b"MSWI"
+    INDEX_HEADER = struct.Struct('4sIQ')  # magic, version, bytes of the wins file indexed
+    INDEX_VERSION = 2
+    EXTENDED = 1 << 31  # length prefix flag for records with 3BV and clicks
+    METRICS = {  # name -> sign, so every list in self.top sorts best first
+        "time":       1,
+        "3bv/s":     -1,
+        "efficiency": -1,
+    }
+
+    def __init__(self, path=WINS_FILE, keep=TOP_SCORES):
+        self.path       = path
+        self.index_path = path + ".idx"
+        self.keep       = keep
+        self.top        = {}  # metric -> mode -> best values (times the metric's sign), sorted
+        self.indexed    = 0
+        self.load_index()
+        self.catch_up()
+
+    @staticmethod
+    def mode_name(width, height, mines):
+        return f"{width}x{height} - {mines} Mines"
+
+    @classmethod
+    def parse_records(cls, data):
+        """Yields (mode, time_taken, three_bv, clicks, end_offset) for every complete record in data.
+
+        three_bv and clicks are 0 for records from before they were kept.
+        """
+        offset, end = 0, len(data)
+        while offset + 4 <= end:
+            length = struct.unpack_from('I', data, offset)[0]
+            extended = length & cls.EXTENDED
+            length &= ~cls.EXTENDED
+            record_end = offset + 4 + length + (12 if extended else 4)
+            if record_end > end:
+                break  # half written record, leave it for next time
+            mode = bytes(data[offset + 4:offset + 4 + length]).decode('utf-8')
+            if extended:
+                time_taken, three_bv, clicks = struct.unpack_from('fII', data, offset + 4 + length)
+            else:
+                time_taken, three_bv, clicks = struct.unpack_from('f', data, offset + 4 + length)[0], 0, 0
+            offset = record_end
+            yield mode, time_taken, three_bv, clicks, offset
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "rb") as file:
+                data = file.read()
+            magic, version, indexed = self.INDEX_HEADER.unpack_from(data)
+            if magic != self.INDEX_MAGIC or version != self.INDEX_VERSION:
+                return  # an older index, catch_up rebuilds it in the new layout
+
+            def read_string(offset):
+                length = struct.unpack_from('I', data, offset)[0]
+                return data[offset + 4:offset + 4 + length].decode('utf-8'), offset + 4 + length
+
+            top, offset = {}, self.INDEX_HEADER.size
+            while offset < len(data):
+                metric, offset = read_string(offset)
+                mode_count = struct.unpack_from('I', data, offset)[0]
+                offset += 4
+                modes = top[metric] = {}
+                for _ in range(mode_count):
+                    mode, offset = read_string(offset)
+                    count = struct.unpack_from('I', data, offset)[0]
+                    modes[mode] = list(struct.unpack_from(f'{count}f', data, offset + 4))
+                    offset += 4 + 4 * count
+        except (OSError, struct.error, UnicodeDecodeError):
+            return  # missing or broken index, catch_up rebuilds it from the wins file
+        self.top, self.indexed = top, indexed
+
+    def save_index(self):
+        def string(text):
+            encoded = text.encode('utf-8')
+            return struct.pack('I', len(encoded)) + encoded
+
+        parts = [self.INDEX_HEADER.pack(self.INDEX_MAGIC, self.INDEX_VERSION, self.indexed)]
+        for metric, modes in self.top.items():
+            parts.append(string(metric) + struct.pack('I', len(modes)))
+            for mode, values in modes.items():
+                parts.append(string(mode) + struct.pack(f'I{len(values)}f', len(values), *values))
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(b"".join(parts))
+        os.replace(temp_path, self.index_path)  # so a crash never leaves half an index
+
+    def catch_up(self):
+        # fold in whatever got appended to the wins file since the index was written
+        try:
+            with open(self.path, "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                if size < self.indexed:  # file was replaced or trimmed, start over
+                    self.top, self.indexed = {}, 0
+                if size == self.indexed:
+                    return
+                file.seek(self.indexed)
+                data = file.read()  # one read for the whole tail
+        except FileNotFoundError:
+            return
+        consumed = 0
+        for mode, time_taken, three_bv, clicks, consumed in self.parse_records(memoryview(data)):
+            self.insert(mode, time_taken, three_bv, clicks)
+        if consumed:
+            self.indexed += consumed
+            self.save_index()
+
+    def insert(self, mode, time_taken, three_bv=0, clicks=0):
+        scores = {"time": time_taken}
+        if three_bv:
+            scores["3bv/s"] = three_bv / time_taken if time_taken else 0.0
+            scores["efficiency"] = three_bv / clicks if clicks else 0.0
+        for metric, value in scores.items():
+            values = self.top.setdefault(metric, {}).setdefault(mode, [])
+            value *= self.METRICS[metric]
+            if len(values) < self.keep or value < values[-1]:
+                bisect.insort(values, value)
+                del values[self.keep:]
+
+    def add(self, mode, time_taken, three_bv, clicks):
+        mode_encoded = mode.encode('utf-8')  # encode the mode string as bytes
+        record = struct.pack('I', len(mode_encoded) | self.EXTENDED) + mode_encoded + struct.pack('fII', time_taken, three_bv, clicks)
+        # 'I' is for unsigned ints (length of the mode string, 3BV, clicks), 'f' is for float (time_taken)
+        with open(self.path, "ab") as file:
+            file.write(record)
+        self.catch_up()  # picks up this record, and anyone else's written in the meantime
+
+    def best(self, mode, count=5, metric="time"):
+        sign = self.METRICS[metric]
+        return [value * sign for value in self.top.get(metric, {}).get(mode, [])[:count]]
+
+
+# ---- GLYPHS
+class Glyphs:
+    """Flag and mine sprites, drawn once per cell size and colour scheme and then reused.
+
+    Each sprite is a transparent CELL_SIZE square PhotoImage, so a flag or mine on the
+    board is a single canvas image over the cell's rectangle, which already carries the
+    tile state as its fill.
+    """
 
-class Minesweeper:
     def __init__(self, master):
+        self.master  = master
+        self.sprites = {}    # name -> PhotoImage, for the current self.key
+        self.key     = None
+
+    def get(self, name):
+        key = (CELL_SIZE, BG_COLOR, UNCLICKED_COLOR)
+        if key != self.key:  # cell size or theme changed, everything drawn for the old one is stale
+            self.sprites.clear()
+            self.key = key
+        sprite = self.sprites.get(name)
+        if sprite is None:
+            sprite = self.sprites[name] = getattr(self, f"draw_{name}")()
+        return sprite
+
+    def blank(self):
+        return tk.PhotoImage(master=self.master, width=CELL_SIZE, height=CELL_SIZE)
+
+    @staticmethod
+    def fill(image, color, x1, y1, x2, y2):
+        x1, y1, x2, y2 = round(x1), round(y1), round(x2), round(y2)
+        if x2 > x1 and y2 > y1:
+            image.put(color, to=(x1, y1, x2, y2))
+
+    def disc(self, image, color, center_x, center_y, radius):
+        # photo images can't draw ovals, so fill one span per pixel row
+        for y in range(int(center_y - radius), int(center_y + radius) + 1):
+            dy = y + 0.5 - center_y
+            if abs(dy) < radius:
+                half = math.sqrt(radius * radius - dy * dy)
+                self.fill(image, color, center_x - half, y, center_x + half, y + 1)
+
+    def draw_flag(self):
+        image = self.blank()
+        flag_color = BG_COLOR
+        total_flag_width = CELL_SIZE / 3  # total width of the flag (line + square + rectangle)
+        flag_height = CELL_SIZE / 3
+        line_thickness = flag_height / 5
+        square_side = flag_height / 2
+        rectangle_height = square_side
+        rectangle_length = square_side * 0.8
+        rectangle_y_offset = square_side * 0.3
+
+        # positions for centering
+        flag_x_start = (CELL_SIZE - total_flag_width) / 2
+        line_y_start = (CELL_SIZE - flag_height) / 2
+        square_x_start = flag_x_start + line_thickness
+        rectangle_x_start = square_x_start + square_side
+        rectangle_y_start = line_y_start + rectangle_y_offset
+
+        # flagpole
+        self.fill(image, flag_color, flag_x_start, line_y_start, flag_x_start + line_thickness, line_y_start + flag_height)
+        # right square
+        self.fill(image, flag_color, square_x_start, line_y_start, square_x_start + square_side, line_y_start + square_side)
+        # right downwards rectangle
+        self.fill(image, flag_color, rectangle_x_start, rectangle_y_start, rectangle_x_start + rectangle_length, rectangle_y_start + rectangle_height)
+        return image
+
+    def draw_mine(self):
+        image = self.blank()
+        center_x = center_y = CELL_SIZE / 2
+        outer_circle_radius = CELL_SIZE * 0.2  # main mine body
+        inner_circle_radius = CELL_SIZE * 0.07  # the inner circle of the same color as the cell
+        leg_size = CELL_SIZE * 0.1  # mines legs
+
+        self.disc(image, BG_COLOR, center_x, center_y, outer_circle_radius)
+        self.disc(image, UNCLICKED_COLOR, center_x, center_y, inner_circle_radius)
+
+        # legs at every 45 degrees around the outer circle
+        for angle in range(0, 360, 45):
+            radian = math.radians(angle)
+            # getting the center position for each leg
+            x_center = center_x + (outer_circle_radius + leg_size/2) * math.cos(radian)
+            y_center = center_y + (outer_circle_radius + leg_size/2) * math.sin(radian)
+            leg_x = x_center - leg_size/2
+            leg_y = y_center - leg_size/2
+            self.fill(image, BG_COLOR, leg_x, leg_y, leg_x + leg_size, leg_y + leg_size)
+        return image
+
+
+class Minesweeper:
+    """One game window's worth of board. Normally it fills the root and starts at the menu.
+
+    A race board (race = its number) goes in the frame it's given instead, skips the menu,
+    and leaves the window open when it's over. Everything about the board is kept on the
+    instance, so any number of them can share one root.
+    """
+    def __init__(self, master, tracer=None, frame=None, race=None, glyphs=None):
+        load_tk()  # no-op once create_root has, but the class can be used without it
         self.master      = master
+        self.frame       = frame or master  # what the board's widgets go in
+        self.race        = race  # board number in a race, None for a normal game
+        self.tracer      = tracer  # see Tracer, None unless --debug or --trace
+        self.width       = 0     # board size, set by start_game
+        self.height      = 0
+        self.mines_count = 0
+        self.debug_label = None
+        self.menu_frame  = None
         self.start_time  = None  
         self.game_active = False
-        self.buttons     = []
+        self.canvas      = None  # the whole grid is drawn on this one canvas
+        self.cells       = {}    # board index -> canvas item of the cell's tile, see cell_item
+        self.hover_cell  = None
+        self.board_locked = False  # set once the game's over, every board handler checks it
+        self.wave        = []    # rings of cells the loss wave still has to draw
+        self.wave_task   = None
         self.scheduled_tasks = []  # Add this line
-        self.mines       = set()
-        self.revealed    = set()
-        self.flags       = set()
+        self.fading      = {}    # board index -> fade frame, advanced by animate_reveals
+        self.animation_task = None
+        self.board       = None  # headless game state, see Board
+        self.solver      = None
+        self.glyphs      = glyphs or Glyphs(master)  # flag/mine sprites, shared by every cell (and every racer)
+        self.endless     = None  # EndlessGame, once endless mode is picked from the menu
+        self.racers      = []    # the boards of a race, when one is started from the menu
+        self.odds_colors = {}    # board index -> overlay colour while the mine odds are shown
         self.temp_blanks = set()
         self.first_click = True
+        self.no_guess    = tk.BooleanVar(master, value=False)
+        self.no_guess_start = None  # starting cell of a pooled no-guess board
+        self.marker      = None  # (row, col) of the start marker while it's drawn
+        self.pool        = BoardPool() if race is None else None  # race boards never use no-guess
+        self.replay_writer = None  # records the current game, see ReplayWriter
+        self.replay_events = None  # set while a replay is being played back instead
+        self.replay_task = None
+        self.resumed     = False  # resumed games aren't recorded, a replay can't start mid-game
+        self.clicks      = 0     # left, right and chord clicks this game, for click efficiency
+        self.snapshot    = None  # autosave of the current game, see Snapshot
+        self.autosave_task = None
+        self.hint_title  = None  # the window title to put back once a "no sure moves" hint is seen
+        if race is not None:
+            return  # the race sets the board up
         self.master.configure(bg=BG_COLOR)
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        if tracer:
+            # swapped for timed versions on the instance, so the untraced path stays untouched
+            self.update_time_elapsed = tracer.wrap("update_time_elapsed", self.update_time_elapsed)
+            self.animate_reveals = tracer.wrap("animate_reveals", self.animate_reveals, frames=True)
         self.show_menu()
+        self.poll_pool()
+        if tracer and tracer.overlay:
+            self.refresh_debug()
 
     def recenter_window(self): # fix for higher grid count boards not being centered properly
         self.master.update_idletasks()  # update the window to get the latest size
@@ -50,21 +1470,38 @@ class Minesweeper:
         title_label = tk.Label(self.menu_frame, text="Select Difficulty", bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", 14, "bold"))
         title_label.pack(pady=(0, 20))
 
-        modes = [
-            # name       width height mines
-            ("Beginner",     9,  9,  10),
-            ("Intermediate", 16, 16, 40),
-            ("Expert",       30, 16, 99)
-            ]
         buttons_frame = tk.Frame(self.menu_frame, bg=BG_COLOR)
         buttons_frame.pack()
 
-        for index, mode in enumerate(modes):
+        for index, mode in enumerate(MODES):
             btn = tk.Button(buttons_frame, text=mode[0], bg=UNCLICKED_COLOR, fg=NUMBER_COLORS,
                             font=("Arial", 12, "bold"), relief="flat",
                             command=lambda m=mode: self.start_game(*m[1:]))
             btn.grid(row=0, column=index, padx=5, pady=5)
 
+        no_guess_check = tk.Checkbutton(self.menu_frame, text="No guessing", variable=self.no_guess,
+                                        bg=BG_COLOR, fg=NUMBER_COLORS, selectcolor=BG_COLOR,
+                                        activebackground=BG_COLOR, activeforeground=NUMBER_COLORS,
+                                        font=("Arial", 11, "bold"))
+        no_guess_check.pack(pady=(5, 0))
+
+        # any size, played on its own or raced on a few copies of the same board
+        custom_frame = tk.Frame(self.menu_frame, bg=BG_COLOR)
+        custom_frame.pack(pady=(15, 0))
+        self.custom_entries = []
+        for column, (label, default) in enumerate((("Width", 30), ("Height", 16), ("Mines", 99), ("Boards", 2))):
+            tk.Label(custom_frame, text=label, bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", 10, "bold")).grid(row=0, column=column, padx=3)
+            entry = tk.Entry(custom_frame, width=5, justify="center", bg=CLICKED_COLOR, fg=NUMBER_COLORS,
+                             insertbackground=NUMBER_COLORS, relief="flat")
+            entry.insert(0, str(default))
+            entry.grid(row=1, column=column, padx=3)
+            self.custom_entries.append(entry)
+        custom_buttons = tk.Frame(self.menu_frame, bg=BG_COLOR)
+        custom_buttons.pack(pady=(5, 0))
+        for column, (text, race) in enumerate((("Custom", False), ("Race", True))):
+            tk.Button(custom_buttons, text=text, bg=UNCLICKED_COLOR, fg=NUMBER_COLORS, font=("Arial", 12, "bold"), relief="flat",
+                      command=lambda r=race: self.start_custom(r)).grid(row=0, column=column, padx=5)
+
         # other title
         other_label = tk.Label(self.menu_frame, text="Other", bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", 12, "bold"))
         other_label.pack(pady=(20, 5))
@@ -74,6 +1511,24 @@ class Minesweeper:
                                     command=self.show_highscores)
         highscores_btn.pack(pady=(5, 5))
 
+        if os.path.exists(SAVE_FILE):
+            resume_btn = tk.Button(self.menu_frame, text="Resume", bg=UNCLICKED_COLOR, fg=NUMBER_COLORS,
+                                   font=("Arial", 12, "bold"), relief="flat",
+                                   command=self.resume_game)
+            resume_btn.pack(pady=(5, 5))
+
+        endless_btn = tk.Button(self.menu_frame, text="Endless", bg=UNCLICKED_COLOR, fg=NUMBER_COLORS,
+                                font=("Arial", 12, "bold"), relief="flat",
+                                command=self.start_endless)
+        endless_btn.pack(pady=(5, 5))
+
+    def poll_pool(self):
+        # keeps the no-guess boards topped up in the background while the option is on
+        self.pool.collect()
+        if self.no_guess.get():
+            self.pool.refill([mode[1:] for mode in MODES])
+        self.master.after(POOL_POLL_MS, self.poll_pool)
+
     def format_time(self, seconds):
         """Converts time in seconds to a formatted string."""
         total_seconds = float(seconds)
@@ -88,6 +1543,13 @@ class Minesweeper:
         formatted_time += f"{seconds:.2f}s"
         return formatted_time
 
+    def format_score(self, metric, value):
+        if metric == "time":
+            return self.format_time(value)
+        if metric == "3bv/s":
+            return f"{value:.2f} 3BV/s"
+        return f"{value:.0%}"  # efficiency, 3BV per click
+
     def show_highscores(self):
         highscores_window = tk.Toplevel(self.master, bg=BG_COLOR)
         highscores_window.title("Highscores")
@@ -99,45 +1561,36 @@ class Minesweeper:
             "Expert":       "30x16 - 99 Mines"
         }
 
+        # what to rank by
+        metrics_frame = tk.Frame(highscores_window, bg=BG_COLOR)
+        metrics_frame.pack(pady=(10, 0))
+
         highscores_frame = tk.Frame(highscores_window, bg=BG_COLOR)
         highscores_frame.pack(pady=(10, 5))
 
         for index, difficulty in enumerate(difficulties.keys()):
             tk.Label(highscores_frame, text=difficulty, bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", 16, "bold")).grid(row=0, column=index, padx=20)
 
-        records = []
-        try:
-            with open("minesweeper.wins", "rb") as file:
-                while True:
-                    length_bytes = file.read(4)  # 4 bytes for unsigned int
-                    if not length_bytes:
-                        break  # End of file
-                    length = struct.unpack('I', length_bytes)[0]
-                    mode_bytes = file.read(length)
-                    mode = mode_bytes.decode('utf-8')
-                    time_taken_bytes = file.read(4)  # 4 bytes for float
-                    time_taken = struct.unpack('f', time_taken_bytes)[0]
-                    records.append((mode, time_taken))
-        except FileNotFoundError:
-            pass
-
-        records.sort(key=lambda x: float(x[1]))
-
-        records_by_difficulty = {difficulty: [] for difficulty in difficulties.keys()}
-        for record in records:
-            for difficulty, format in difficulties.items():
-                if format in record[0]:
-                    records_by_difficulty[difficulty].append(record)
-                    break
-
-        for index, (difficulty, records) in enumerate(records_by_difficulty.items()):
-            if not records:  # Check if there are no records for the difficulty
-                tk.Label(highscores_frame, text="No scores set!", bg=BG_COLOR, fg=NUMBER_COLORS).grid(row=1, column=index, padx=20)
-                continue  # Skip to the next difficulty
-            top_records = records[:5]
-            for row, record in enumerate(top_records, start=1):
-                formatted_time = self.format_time(record[1])
-                tk.Label(highscores_frame, text=formatted_time, bg=BG_COLOR, fg=NUMBER_COLORS).grid(row=row, column=index, padx=20)
+        scores = ScoreStore()
+        score_labels = []
+
+        def show_metric(metric):
+            for label in score_labels:
+                label.destroy()
+            score_labels.clear()
+            for index, mode in enumerate(difficulties.values()):
+                best = scores.best(mode, metric=metric)
+                # no records for the difficulty (older wins only have a time)
+                texts = [self.format_score(metric, value) for value in best] or ["No scores set!"]
+                for row, text in enumerate(texts, start=1):
+                    label = tk.Label(highscores_frame, text=text, bg=BG_COLOR, fg=NUMBER_COLORS)
+                    label.grid(row=row, column=index, padx=20)
+                    score_labels.append(label)
+
+        for metric, title in (("time", "Time"), ("3bv/s", "3BV/s"), ("efficiency", "Efficiency")):
+            tk.Button(metrics_frame, text=title, bg=UNCLICKED_COLOR, fg=NUMBER_COLORS, font=("Arial", 11, "bold"), relief="flat",
+                      command=lambda m=metric: show_metric(m)).pack(side="left", padx=5)
+        show_metric("time")
 
         highscores_window.update_idletasks()
 
@@ -155,22 +1608,125 @@ class Minesweeper:
         highscores_window.geometry(f'+{center_x}+{center_y}')
 
 
-    def start_game(self, width, height, mines):
-        global GRID_WIDTH, GRID_HEIGHT, MINES_COUNT
-        GRID_WIDTH, GRID_HEIGHT, MINES_COUNT = width, height, mines
-        self.menu_frame.destroy()  # remove menu after starting
-        self.buttons = [[None for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+    def start_game(self, width, height, mines, seed=None, board=None):
+        self.width, self.height, self.mines_count = width, height, mines
+        if self.menu_frame is not None:
+            self.menu_frame.destroy()  # remove menu after starting
+        self.board_locked = False
+        self.clicks = 0
+        self.no_guess_start = None
+        self.marker = None
+        self.resumed = board is not None
+        # no guessing is only for the menu modes, the sizes the pool keeps boards for. a custom
+        # board would be searched for on the first click, which can take ages or find nothing
+        no_guess = self.no_guess.get() and (width, height, mines) in [mode[1:] for mode in MODES]
+        pooled = self.pool.take(self.width, self.height, self.mines_count) if no_guess and seed is None and board is None else None
+        if board is not None:  # resumed
+            self.board = board
+        elif seed is not None:  # replays
+            self.board = Board(self.width, self.height, self.mines_count, seed=seed)
+        elif pooled:
+            seed, start_row, start_col = pooled
+            self.no_guess_start = (start_row, start_col)
+            self.board = Board(self.width, self.height, self.mines_count, seed=seed)
+        else:
+            # pool's empty (or it's off), work it out on the first click instead
+            self.board = Board(self.width, self.height, self.mines_count, no_guess=no_guess)
+        self.solver = Solver(self.board)
         self.create_widgets()
+        if self.no_guess_start:
+            self.draw_start_marker(*self.no_guess_start)
+        if self.race is not None:
+            # every racer gets the same layout, opened from the marked cell
+            self.board.place_mines(height // 2, width // 2)
+            self.draw_start_marker(height // 2, width // 2)
         self.recenter_window()  # fix for higher grid count boards not being centered properly
 
 
 
+    def resume_game(self):
+        try:
+            self.snapshot, elapsed, clicks = Snapshot.resume()
+        except (OSError, ValueError, struct.error) as error:
+            messagebox.showerror("Minesweeper", f"Couldn't resume the saved game: {error}")
+            return
+        board = self.snapshot.board
+        self.start_game(board.width, board.height, board.mines_count, board=board)
+        self.clicks = clicks
+        self.first_click = False
+        self.start_time = time.time() - elapsed
+        self.game_active = True
+        for index in range(board.size):
+            if board.revealed[index]:
+                self.canvas.itemconfig(self.cell_item(index), fill=CLICKED_COLOR)
+                self.draw_number(index)
+            elif board.flags[index]:
+                self.draw_flag(*divmod(index, self.width))
+        self.update_flag_counter()
+        self.update_time_elapsed()
+        self.autosave()
+
+    def autosave(self):
+        if self.autosave_task is not None:
+            self.scheduled_tasks.remove(self.autosave_task)
+            self.autosave_task = None
+        if self.snapshot is None:
+            return
+        self.snapshot.flush(time.time() - self.start_time, self.clicks)
+        self.autosave_task = self.master.after(AUTOSAVE_MS, self.autosave)
+        self.scheduled_tasks.append(self.autosave_task)
+
+    def drop_snapshot(self):
+        if self.snapshot is not None:
+            self.snapshot.discard()
+            self.snapshot = None
+
+    def on_close(self):
+        # the game in progress is kept for the Resume button
+        if self.snapshot is not None:
+            self.snapshot.close(time.time() - self.start_time, self.clicks)
+            self.snapshot = None
+        self.master.destroy()
+
+    def start_custom(self, race):
+        try:
+            width, height, mines, boards = (int(entry.get()) for entry in self.custom_entries)
+            Board(width, height, mines)  # bad sizes/mine counts fail here
+            if race and not 2 <= boards <= RACE_BOARDS:
+                raise ValueError(f"a race is 2 to {RACE_BOARDS} boards, got {boards}")
+        except ValueError as error:
+            messagebox.showerror("Minesweeper", f"Can't start that game: {error}")
+            return
+        if race:
+            self.start_race(boards, width, height, mines)
+        else:
+            self.start_game(width, height, mines)
+
+    def start_race(self, count, width, height, mines):
+        # copies of one board side by side in this window, each just its own Minesweeper
+        self.menu_frame.destroy()
+        self.menu_frame = None
+        seed = random.randrange(2**32)
+        self.racers = []
+        for number in range(1, count + 1):
+            frame = tk.Frame(self.master, bg=BG_COLOR)
+            frame.grid(row=0, column=number - 1, padx=5)
+            racer = Minesweeper(self.master, frame=frame, race=number, glyphs=self.glyphs)
+            racer.start_game(width, height, mines, seed=seed)
+            self.racers.append(racer)
+        self.recenter_window()
+
+    def start_endless(self):
+        self.menu_frame.destroy()
+        self.endless = EndlessGame(self.master, self.glyphs)
+        self.recenter_window()
+
     def create_widgets(self):
         # Flag Counter Frame and Label
-        self.info_frame = tk.Frame(self.master, bg=BG_COLOR, height=CELL_SIZE)
-        self.info_frame.grid(row=0, column=0, columnspan=GRID_WIDTH, sticky="nsew")
+        self.info_frame = tk.Frame(self.frame, bg=BG_COLOR, height=CELL_SIZE)
+        self.info_frame.grid(row=0, column=0, sticky="nsew")
         
-        self.flag_counter_label = tk.Label(self.info_frame, text=f"Flagged: 0/{MINES_COUNT}", bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.5), "bold"))
+        self.flag_counter_label = tk.Label(self.info_frame, text=f"Flagged: 0/{self.mines_count}", bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.5), "bold"))
         self.flag_counter_label.pack(side="left", padx=(10, 0))
         
         # Restart Button
@@ -181,58 +1737,284 @@ class Minesweeper:
         self.time_elapsed_label = tk.Label(self.info_frame, text="Time: 0s", bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.5), "bold"))
         self.time_elapsed_label.pack(side="right", padx=(0, 10)) 
 
-        for row in range(1, GRID_HEIGHT + 1):  # grid placement for buttons from row 1
-            for col in range(GRID_WIDTH):
-                button = tk.Canvas(self.master, width=CELL_SIZE, height=CELL_SIZE, bg=UNCLICKED_COLOR, highlightthickness=0)
-                button.grid(row=row, column=col, sticky="nsew")
-                button.bind("<Button-1>",        lambda e, r=row, c=col: self.cell_click(r-1, c, e)) 
-                button.bind("<ButtonRelease-1>", lambda e, r=row, c=col: self.hide_temporary_blanks(r-1, c, e))  
-                button.bind("<Button-3>",        lambda e, r=row, c=col: self.place_flag(r-1, c))
-                button.bind("<Enter>",           lambda e, r=row, c=col: self.on_hover(e, r-1, c))  
-                button.bind("<Leave>",           lambda e, r=row, c=col: self.on_leave(e, r-1, c))  
-                self.buttons[row-1][col] = button
+        # one canvas for the whole board, each cell is just a rectangle item on it.
+        # used to be a canvas widget per cell, which got really slow to build on big boards.
+        # the background is the unclicked colour, so a fresh board needs no items at all
+        self.canvas = tk.Canvas(self.frame, width=self.width * CELL_SIZE, height=self.height * CELL_SIZE, bg=UNCLICKED_COLOR, highlightthickness=0)
+        self.canvas.grid(row=1, column=0)
+        self.cells = {}
+        # colours for each frame of the reveal fade, worked out once instead of per cell
+        self.fade_palette = [self.interpolate_color(UNCLICKED_COLOR, CLICKED_COLOR, frame / FADE_FRAMES) for frame in range(FADE_FRAMES + 1)]
+        self.odds_palette = [self.interpolate_color(HINT_COLOR, ODDS_MINE_COLOR, step / 20) for step in range(21)]
+        self.canvas.bind("<Button-1>",        self.traced("click",       lambda e: self.on_canvas_event(e, self.cell_click)))
+        self.canvas.bind("<ButtonRelease-1>", self.traced("release",     lambda e: self.on_canvas_event(e, self.hide_temporary_blanks)))
+        self.canvas.bind("<Button-3>",        self.traced("right-click", lambda e: self.on_canvas_event(e, self.place_flag)))
+        self.canvas.bind("<Motion>",          self.traced("enter",       self.on_motion))  # enter/leave between cells
+        self.canvas.bind("<Leave>",           self.traced("leave",       self.on_canvas_leave))
+        if self.race is None:  # no solver help in a race
+            self.master.bind("<KeyPress-h>", self.traced("hint", lambda e: self.show_hint()))
+            self.master.bind("<KeyPress-a>", self.traced("auto", lambda e: self.auto_play()))
+            self.master.bind("<KeyPress-p>", self.traced("odds", lambda e: self.toggle_odds()))
+        if self.tracer and self.tracer.overlay:
+            self.debug_label = tk.Label(self.frame, bg=BG_COLOR, fg=TEMP_BLANK_COLOR, font=("Courier", 9), justify="left", anchor="w")
+            self.debug_label.grid(row=2, column=0, sticky="ew")
+
+    def traced(self, name, handler):
+        return self.tracer.wrap(name, handler) if self.tracer else handler
+
+    def refresh_debug(self):
+        # one line per handler: calls, average and worst time since the last refresh
+        self.master.after(DEBUG_REFRESH_MS, self.refresh_debug)
+        if self.debug_label is None:
+            return
+        pending = len(self.master.tk.call('after', 'info'))
+        self.tracer.counter("pending after", pending)
+        lines = [f"pending after: {pending}  scheduled_tasks: {len(self.scheduled_tasks)}  fading: {len(self.fading)}"]
+        for name, (calls, total, worst) in sorted(self.tracer.take_recent().items()):
+            if name.endswith(" ms") or name == "pending after":  # counters, already in ms / a count
+                lines.append(f"{name:<20} avg {total / calls:7.2f}  max {worst:7.2f}")
+            else:
+                lines.append(f"{name:<20} x{calls:<4} avg {total / calls * 1000:7.3f}ms  max {worst * 1000:7.3f}ms")
+        self.debug_label.config(text="\n".join(lines))
+
+    def cell_at(self, event):
+        """Maps pointer coordinates on the board canvas to a (row, col), or None if off the grid."""
+        row, col = int(event.y // CELL_SIZE), int(event.x // CELL_SIZE)
+        if 0 <= row < self.height and 0 <= col < self.width:
+            return row, col
+        return None
+
+    def on_canvas_event(self, event, handler):
+        if self.board_locked:
+            return
+        cell = self.cell_at(event)
+        if cell is not None:
+            handler(*cell, event)
+
+    def on_motion(self, event):
+        # the canvas only gets one <Enter>/<Leave>, so work out cell changes ourselves
+        if self.board_locked:
+            return
+        cell = self.cell_at(event)
+        if cell == self.hover_cell:
+            return
+        if self.hover_cell is not None:
+            self.on_leave(event, *self.hover_cell)
+        self.hover_cell = cell
+        if cell is not None:
+            self.on_hover(event, *cell)
+
+    def on_canvas_leave(self, event):
+        if self.hover_cell is not None and not self.board_locked:
+            self.on_leave(event, *self.hover_cell)
+            self.hover_cell = None
+
+    def cell_item(self, index):
+        # a cell only gets a rectangle the first time it stops being plain unclicked,
+        # until then the canvas background is the cell
+        item = self.cells.get(index)
+        if item is None:
+            row, col = divmod(index, self.width)
+            item = self.cells[index] = self.canvas.create_rectangle(col * CELL_SIZE, row * CELL_SIZE, (col + 1) * CELL_SIZE, (row + 1) * CELL_SIZE,
+                                                                    fill=UNCLICKED_COLOR, width=0)
+            if self.board.flags[index] or (row, col) == self.marker:
+                self.canvas.tag_lower(item)  # under what's already on the cell
+        return item
+
+    def set_cell_color(self, row, col, color):
+        self.canvas.itemconfig(self.cell_item(row * self.width + col), fill=color)
+
+    def draw_start_marker(self, row, col):
+        # a pooled no-guess board is only guess free when opened from this cell
+        self.marker = (row, col)
+        x, y = self.cell_origin(row, col)
+        radius = CELL_SIZE * 0.15
+        self.canvas.create_oval(x + CELL_SIZE/2 - radius, y + CELL_SIZE/2 - radius, x + CELL_SIZE/2 + radius, y + CELL_SIZE/2 + radius,
+                                fill=HINT_COLOR, outline=HINT_COLOR, tags="start")
+
+    def cell_origin(self, row, col):
+        # top left corner of a cell on the board canvas
+        return col * CELL_SIZE, row * CELL_SIZE
 
     def restart_game(self):
+        seed = self.board.seed if self.race is not None else None  # a race board stays the same board
         # Cancel all scheduled tasks
         for task_id in self.scheduled_tasks:
             self.master.after_cancel(task_id)
         self.scheduled_tasks.clear()  # Clear the list of task IDs
+        self.fading.clear()
+        self.animation_task = None
+        self.wave.clear()
+        self.wave_task = None
+        self.autosave_task = None
+        self.replay_task = None
+        self.replay_events = None  # a restart ends playback, the new game is played (and recorded) as normal
+        self.close_replay()
+        self.drop_snapshot()
+        self.clear_hint_title()
 
         # Clear the current game state
-        for row in self.buttons:
-            for button in row:
-                button.destroy()
-        self.buttons.clear()
-        self.mines.clear()
-        self.revealed.clear()
-        self.flags.clear()
+        self.canvas.destroy()
+        self.info_frame.destroy()
+        if self.debug_label is not None:
+            self.debug_label.destroy()
+            self.debug_label = None
+        self.cells.clear()
+        self.hover_cell = None
+        self.board = None
+        self.solver = None
+        self.odds_colors.clear()
         self.temp_blanks.clear()
         self.first_click = True
         self.game_active = False
         # Start a new game with the same settings
-        self.start_game(GRID_WIDTH, GRID_HEIGHT, MINES_COUNT)
+        self.start_game(self.width, self.height, self.mines_count, seed=seed)
 
     def on_hover(self, event, row, col):
         # if the cell is revealed, flagged, or neither
-        if (row, col) not in self.revealed:
-            if (row, col) in self.flags:
+        index = self.board.index(row, col)
+        if not self.board.revealed[index]:
+            if self.board.flags[index]:
                 # slightly lighter gray for flagged cells on hover
-                self.buttons[row][col].config(bg="#7e7e7e") # TODO: move to top constants
+                self.set_cell_color(row, col, "#7e7e7e") # TODO: move to top constants
             else:
                 # slightly lighter color for unclicked cells on hover
-                self.buttons[row][col].config(bg="#e89b53")
+                self.set_cell_color(row, col, "#e89b53")
 
     def on_leave(self, event, row, col):
         # Reset the color based on whether the cell is flagged or not
-        if (row, col) not in self.revealed:
-            if (row, col) in self.flags:
+        index = self.board.index(row, col)
+        if not self.board.revealed[index]:
+            if self.board.flags[index]:
                 # Reset to the original flag color
-                self.buttons[row][col].config(bg="#666666")  # TODO: move to top constants
+                self.set_cell_color(row, col, "#666666")  # TODO: move to top constants
             else:
-                # Reset to the original unclicked color
-                self.buttons[row][col].config(bg=UNCLICKED_COLOR)
+                # Reset to the original unclicked color (or its odds colour if those are up)
+                self.set_cell_color(row, col, self.odds_colors.get(index, UNCLICKED_COLOR))
 
 
+    def show_hint(self):
+        # green for a cell that's certainly safe. hovering over it puts it back to normal
+        if not self.game_active:
+            return
+        safe, mines = self.solver.find_moves()
+        if safe:
+            self.set_cell_color(*divmod(min(safe), self.width), HINT_COLOR)
+        elif self.hint_title is None:
+            self.hint_title = self.master.title()
+            self.master.title(f"{self.hint_title} - no sure moves, time to guess")
+
+    def clear_hint_title(self):
+        # the "no sure moves" title only holds until the board changes
+        if self.hint_title is not None:
+            self.master.title(self.hint_title)
+            self.hint_title = None
+
+    def auto_play(self):
+        # plays every move the solver is sure of, through the normal click/flag paths
+        while self.game_active:
+            safe, mines = self.solver.find_moves()
+            if not safe and not mines:
+                break
+            moves = (self.board.revealed_count, self.board.flag_count)
+            for index in mines:
+                if not self.board.flags[index]:
+                    self.place_flag(*divmod(index, self.width))
+            for index in safe:
+                if not self.game_active:
+                    return
+                if not self.board.flags[index]:
+                    self.cell_click(*divmod(index, self.width), None)
+            if (self.board.revealed_count, self.board.flag_count) == moves:
+                break  # nothing this pass did anything, another one wouldn't either
+
+    def toggle_odds(self):
+        if self.odds_colors:
+            for index in self.odds_colors:
+                if not self.board.revealed[index] and not self.board.flags[index]:
+                    self.set_cell_color(*divmod(index, self.width), UNCLICKED_COLOR)
+            self.odds_colors.clear()
+        else:
+            self.show_odds()
+
+    def show_odds(self):
+        # colours every hidden cell from green (never a mine) to red (always a mine)
+        if not self.game_active:
+            return
+        self.odds_colors = {}
+        for index, probability in self.solver.probabilities().items():
+            if self.board.flags[index]:
+                continue
+            color = self.odds_palette[round(probability * 20)]
+            self.odds_colors[index] = color
+            self.set_cell_color(*divmod(index, self.width), color)
+
+    def refresh_odds(self):
+        # odds go stale after every move, so redo them if they're showing
+        if self.odds_colors and self.game_active:
+            self.show_odds()
+
+    def record(self, kind, row, col):
+        if self.replay_events is not None:
+            return  # don't record a replay of a replay
+        if self.resumed:
+            return
+        if self.replay_writer is None:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.width}x{self.height}-{self.mines_count}"
+            if self.race is not None:
+                name += f"-race{self.race}"  # the boards all start in the same second
+            path = os.path.join(REPLAY_DIR, f"{name}.msr")
+            copy = 1
+            while self.replay_writer is None:
+                try:
+                    self.replay_writer = ReplayWriter(path, self.board)
+                except FileExistsError:  # names only go down to the second, restarts can beat that
+                    copy += 1
+                    path = os.path.join(REPLAY_DIR, f"{name}-{copy}.msr")
+        self.replay_writer.record(kind, row * self.width + col)
+
+    def close_replay(self):
+        if self.replay_writer is not None:
+            self.replay_writer.close()
+            self.replay_writer = None
+
+    def play_replay(self, path, speed=1.0):
+        """Plays a replay file back through the window, speed times faster than it was played."""
+        (width, height, mines, seed, start), events = read_replay(path)
+        self.start_game(width, height, mines, seed=seed)
+        if start is not None:
+            self.board.place_mines(*divmod(start, width))  # before the first click, like a race board
+        self.replay_events = events
+        self.replay_speed = speed
+        self.replay_started = time.perf_counter()
+        self.next_replay_event()
+
+    def next_replay_event(self):
+        # only ever one event waiting on a timer, the rest stay in the file
+        event = next(self.replay_events, None)
+        if event is None:
+            return
+        seconds, kind, index = event
+        delay = seconds / self.replay_speed - (time.perf_counter() - self.replay_started)
+        self.replay_task = self.master.after(max(0, int(delay * 1000)), lambda: self.apply_replay_event(kind, index))
+        self.scheduled_tasks.append(self.replay_task)
+
+    def apply_replay_event(self, kind, index):
+        self.scheduled_tasks.remove(self.replay_task)
+        self.replay_task = None
+        row, col = divmod(index, self.width)
+        if kind == REPLAY_FLAG:
+            self.place_flag(row, col)
+        elif kind in (REPLAY_CLICK, REPLAY_CHORD):
+            self.cell_click(row, col, None)
+            if self.board.lost or self.check_win():
+                return  # game_over has taken the window down
+            self.hide_temporary_blanks(row, col, None)
+        else:
+            return
+        self.next_replay_event()
+
     def update_time_elapsed(self):
         if self.game_active:  # only update if the game is active
             elapsed_time = int(time.time() - self.start_time)
@@ -241,18 +2023,19 @@ class Minesweeper:
 
     # ---- DRAWING
     def place_flag(self, row, col, event=None):
-        if self.first_click or (row, col) in self.revealed:  # so we can't flag on the first click or unrevealed cells
+        self.clicks += 1
+        self.clear_hint_title()
+        flagged = self.board.toggle_flag(row, col)
+        if flagged is None:  # so we can't flag on the first click or revealed cells
             return
-        button = self.buttons[row][col]
-        if (row, col) in self.flags:
-            self.flags.remove((row, col))
-            button.delete("flag")
-            button.config(bg=UNCLICKED_COLOR)  # reset if flag removed
+        self.record(REPLAY_FLAG, row, col)
+        if not flagged:
+            self.canvas.delete(f"flag{self.board.index(row, col)}")
+            self.set_cell_color(row, col, UNCLICKED_COLOR)  # reset if flag removed
             self.on_hover(None, row, col)
         else:
-            self.flags.add((row, col))
-            button.config(bg="#666666") # TODO: move to top constants
-            self.draw_flag(button)
+            self.set_cell_color(row, col, "#666666") # TODO: move to top constants
+            self.draw_flag(row, col)
             
             # manually trigger hor the flag cell
             # before, it was staying the main flag gray instead of becoming lighter
@@ -260,109 +2043,104 @@ class Minesweeper:
             
         self.update_flag_counter()
         self.update_adjacent_cells_status(row, col)
+        self.refresh_odds()
 
     def update_flag_counter(self, flags=None):
         # allows for manually setting flags to x when the user reveals all cells
         if flags is None:
-            flags = len(self.flags)
-        self.flag_counter_label.config(text=f"Flagged: {flags}/{MINES_COUNT}")
+            flags = self.board.flag_count
+        self.flag_counter_label.config(text=f"Flagged: {flags}/{self.mines_count}")
 
-    def draw_flag(self, button):
-        flag_color = BG_COLOR
-        total_flag_width = CELL_SIZE / 3  # total width of the flag (line + square + rectangle)
-        flag_height = CELL_SIZE / 3
-        line_thickness = flag_height / 5
-        square_side = flag_height / 2
-        rectangle_height = square_side
-        rectangle_length = square_side * 0.8
-        rectangle_y_offset = square_side * 0.3
-        
-        # positions for centering
-        flag_x_start = (CELL_SIZE - total_flag_width) / 2
-        line_y_start = (CELL_SIZE - flag_height) / 2
-        square_x_start = flag_x_start + line_thickness
-        rectangle_x_start = square_x_start + square_side
-        rectangle_y_start = line_y_start + rectangle_y_offset
-        
-        # flagpole
-        button.create_rectangle(flag_x_start, line_y_start, flag_x_start + line_thickness, line_y_start + flag_height, tags="flag", fill=flag_color, outline=flag_color)
-        
-        # right square
-        button.create_rectangle(square_x_start, line_y_start, square_x_start + square_side, line_y_start + square_side, tags="flag", fill=flag_color, outline=flag_color)
-        
-        # right downwards rectangle
-        button.create_rectangle(rectangle_x_start, rectangle_y_start, rectangle_x_start + rectangle_length, rectangle_y_start + rectangle_height, tags="flag", fill=flag_color, outline=flag_color)
+    def draw_flag(self, row, col):
+        x, y = self.cell_origin(row, col)
+        tag = ("flag", f"flag{row * self.width + col}")  # per cell tag so it can be removed on its own
+        self.canvas.create_image(x, y, image=self.glyphs.get("flag"), anchor="nw", tags=tag)
 
     def cell_click(self, row, col, event):
+        self.clicks += 1
+        self.clear_hint_title()
         if self.first_click:
             self.first_click = False
             self.start_time = time.time()
             self.game_active = True  # game starts
             self.update_time_elapsed()  # start updating time elapsed
+            self.canvas.delete("start")
+            self.marker = None
+            if self.no_guess_start and (row, col) != self.no_guess_start:
+                self.board.no_guess = True  # opened somewhere else, find a new layout for this cell
             self.place_mines(row, col)
-            self.reveal_cell(row, col)
-        elif (row, col) not in self.flags and (row, col) not in self.revealed:
-            if (row, col) in self.mines:
-                self.game_over(False)
-            else:
-                self.reveal_cell(row, col)
-                if self.check_win():
-                    self.game_over(True)
-        elif (row, col) in self.revealed:
+            self.record(REPLAY_CLICK, row, col)  # after placing, so the replay gets the final seed
+            if self.replay_events is None and self.race is None:  # one save file, for the one normal game
+                self.snapshot = Snapshot.create(self.board)
+                self.autosave()
+            self.open_cell(row, col)  # only a race board's first click can hit a mine
+        elif self.board.revealed[self.board.index(row, col)]:
+            self.record(REPLAY_CHORD, row, col)
             self.chord_or_show_temp_blanks(row, col)
+        else:
+            self.record(REPLAY_CLICK, row, col)
+            self.open_cell(row, col)
+        self.refresh_odds()
+
+    def open_cell(self, row, col):
+        self.show_revealed(self.board.click(row, col))  # no-op on flagged cells
+        if self.board.lost:
+            self.game_over(False)
+        elif self.check_win():
+            self.game_over(True)
 
     def chord_or_show_temp_blanks(self, row, col):
         num = self.adjacent_mines(row, col)
-        flags_around = sum((r, c) in self.flags for r in range(max(0, row-1), min(GRID_HEIGHT, row+2)) for c in range(max(0, col-1), min(GRID_WIDTH, col+2)))
+        flags_around = self.board.adjacent_flags(row, col)
         if num == flags_around:
-            for r in range(max(0, row-1), min(GRID_HEIGHT, row+2)):
-                for c in range(max(0, col-1), min(GRID_WIDTH, col+2)):
-                    if (r, c) not in self.flags:
-                        if (r, c) in self.mines:
-                            self.game_over(False)
-                            return
-                        self.reveal_cell(r, c)
+            self.show_revealed(self.board.chord(row, col))
+            if self.board.lost:
+                self.game_over(False)
             # check for a win after chording
-            if self.check_win():
+            elif self.check_win():
                 self.game_over(True)
         elif flags_around > num:  # red highlight if more flags are placed around it than the number indicates
-            self.buttons[row][col].config(bg=IMPOSSIBLE_COLOR)
+            self.set_cell_color(row, col, IMPOSSIBLE_COLOR)
         else:
             self.show_temporary_blanks(row, col)
 
     def show_temporary_blanks(self, row, col):
-        for r in range(max(0, row-1), min(GRID_HEIGHT, row+2)):
-            for c in range(max(0, col-1), min(GRID_WIDTH, col+2)):
-                if (r, c) not in self.revealed and (r, c) not in self.flags:
-                    self.buttons[r][c].config(bg=TEMP_BLANK_COLOR)
-                    self.temp_blanks.add((r, c))
+        board = self.board
+        for index in board.neighbours(board.index(row, col)):
+            if not board.revealed[index] and not board.flags[index]:
+                r, c = divmod(index, board.width)
+                self.set_cell_color(r, c, TEMP_BLANK_COLOR)
+                self.temp_blanks.add((r, c))
 
     def hide_temporary_blanks(self, row, col, event):
         for r, c in self.temp_blanks:
-            self.buttons[r][c].config(bg=UNCLICKED_COLOR)
+            self.set_cell_color(r, c, self.odds_colors.get(r * self.width + c, UNCLICKED_COLOR))
         self.temp_blanks.clear()
 
     def update_adjacent_cells_status(self, row, col):
-        for r in range(max(0, row-1), min(GRID_HEIGHT, row+2)):
-            for c in range(max(0, col-1), min(GRID_WIDTH, col+2)):
-                if (r, c) in self.revealed:
-                    num = self.adjacent_mines(r, c)
-                    flags_around = sum((rr, cc) in self.flags for rr in range(max(0, r-1), min(GRID_HEIGHT, r+2)) for cc in range(max(0, c-1), min(GRID_WIDTH, c+2)))
-                    if flags_around > num:
-                        self.buttons[r][c].config(bg=IMPOSSIBLE_COLOR)
-                    else:
-                        self.buttons[r][c].config(bg=CLICKED_COLOR)  # change to normal if it's logical now
+        # the board keeps flag counts per cell, so this is just a lookup for each neighbour
+        board = self.board
+        for index in board.neighbours(board.index(row, col)):
+            if board.revealed[index]:
+                if board.is_impossible(index):
+                    self.canvas.itemconfig(self.cell_item(index), fill=IMPOSSIBLE_COLOR)
+                else:
+                    self.canvas.itemconfig(self.cell_item(index), fill=CLICKED_COLOR)  # change to normal if it's logical now
 
 
     def place_mines(self, start_row, start_col):
-        safe_zone = {(start_row + i, start_col + j) for i in range(-1, 2) for j in range(-1, 2)}
-        while len(self.mines) < MINES_COUNT:
-            r, c = random.randint(0, GRID_HEIGHT - 1), random.randint(0, GRID_WIDTH - 1)
-            if (r, c) not in safe_zone and (r, c) not in self.mines:
-                self.mines.add((r, c))
-
-    def fade_out_cell(self, button, steps, final_color, callback=None):
-        current_color = button.cget('bg')
+        if self.board.placed:  # race boards are laid out before the first click
+            return
+        try:
+            self.board.place_mines(start_row, start_col)
+        except ValueError:
+            # no guess free layout turned up, so play a normal one rather than a broken game
+            self.board.no_guess = False
+            self.board.place_mines(start_row, start_col)
+            messagebox.showinfo("Minesweeper", "Couldn't find a board that can be solved without guessing, this one might need a guess.")
+
+    def fade_out_cell(self, row, col, steps, final_color, callback=None):
+        current_color = self.canvas.itemcget(self.cell_item(row * self.width + col), 'fill')
         r1, g1, b1 = self.master.winfo_rgb(current_color)
         r2, g2, b2 = self.master.winfo_rgb(final_color)
         
@@ -375,7 +2153,7 @@ class Minesweeper:
             if step < steps:
                 r1, g1, b1 = r1 + delta_r, g1 + delta_g, b1 + delta_b
                 next_color = f'#{int(r1/256):02x}{int(g1/256):02x}{int(b1/256):02x}' # what
-                button.config(bg=next_color)
+                self.set_cell_color(row, col, next_color)
                 self.master.after(25, lambda: fade(step+1))  # schedule next step
             else:
                 if callback:
@@ -393,131 +2171,646 @@ class Minesweeper:
         return f'#{r>>8:02x}{g>>8:02x}{b>>8:02x}' # what v2
 
     def reveal_cell(self, row, col):
-        queue = [(row, col)]
-        while queue:
-            current_row, current_col = queue.pop(0)
-            if (current_row, current_col) in self.revealed or (current_row, current_col) in self.flags:
-                continue
-            self.revealed.add((current_row, current_col))
-            button = self.buttons[current_row][current_col]
-
-            steps = 10 
-            for i in range(steps + 1):
-                factor = i / steps
-                color = self.interpolate_color(UNCLICKED_COLOR, CLICKED_COLOR, factor)
-                task_id = self.master.after(int(i * 50), lambda b=button, c=color: b.config(bg=c))
-                self.scheduled_tasks.append(task_id)  # Store the task ID
-
-            mines_count = self.adjacent_mines(current_row, current_col)
-            if mines_count == 0:
-                for r in range(max(0, current_row-1), min(GRID_HEIGHT, current_row+2)):
-                    for c in range(max(0, current_col-1), min(GRID_WIDTH, current_col+2)):
-                        if (r, c) not in self.revealed and (r, c) not in self.flags:
-                            queue.append((r, c))
-            else:
-                self.master.after(steps * 10, lambda b=button, mc=mines_count: b.create_text(CELL_SIZE//2, CELL_SIZE//2, text=str(mc), fill=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.7), "bold")))
+        self.show_revealed(self.board.reveal(row, col))
+
+    def show_revealed(self, indices):
+        # the board has already flood filled, this just draws what it opened
+        if len(indices) > REVEAL_ANIMATION_LIMIT:
+            # huge openings would just be a wall of fading tiles anyway
+            for index in indices:
+                self.canvas.itemconfig(self.cell_item(index), fill=CLICKED_COLOR)
+                self.draw_number(index)
+            return
+        for index in indices:
+            self.fading[index] = 0
+        if self.animation_task is None and self.fading:
+            self.animation_task = self.master.after(FRAME_MS, self.animate_reveals)
+            self.scheduled_tasks.append(self.animation_task)
+
+    def animate_reveals(self):
+        # one timer steps every fading cell per frame, rather than 11 after() calls per cell
+        self.scheduled_tasks.remove(self.animation_task)
+        self.animation_task = None
+        still_fading = {}
+        for index, frame in self.fading.items():
+            self.canvas.itemconfig(self.cell_item(index), fill=self.fade_palette[frame])
+            if frame == NUMBER_FRAME:
+                self.draw_number(index)
+            if frame < FADE_FRAMES:
+                still_fading[index] = frame + 1
+        self.fading = still_fading
+        if still_fading:
+            self.animation_task = self.master.after(FRAME_MS, self.animate_reveals)
+            self.scheduled_tasks.append(self.animation_task)
+
+    def draw_number(self, index):
+        mines_count = self.board.counts[index]
+        if mines_count:
+            x, y = self.cell_origin(*divmod(index, self.width))
+            self.canvas.create_text(x + CELL_SIZE//2, y + CELL_SIZE//2, text=str(mines_count), fill=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.7), "bold"), tags="number")
 
     def adjacent_mines(self, row, col):
-        return sum((r, c) in self.mines for r in range(max(0, row-1), min(GRID_HEIGHT, row+2)) for c in range(max(0, col-1), min(GRID_WIDTH, col+2)))
-    
+        return self.board.adjacent_mines(row, col)
+
     def check_win(self):
-        # if all non-mine cells revealed
-        if len(self.revealed) == GRID_WIDTH * GRID_HEIGHT - MINES_COUNT:
-            return True
-        return False
+        return self.board.check_win()
         
     def game_over(self, win):
         self.game_active = False  # stop time updates
-        # disable all buttons to prevent further interaction
-        for row in range(GRID_HEIGHT):
-            for col in range(GRID_WIDTH):
-                self.buttons[row][col].unbind("<Button-1>")
-                self.buttons[row][col].unbind("<Button-3>")
-                self.buttons[row][col].unbind("<Enter>")
-                self.buttons[row][col].unbind("<Leave>")
+        self.close_replay()
+        self.drop_snapshot()
+        # disable the board to prevent further interaction
+        self.board_locked = True
 
         if not win:
             # if game is lost, we reveal all the mines and the whole board
             # base minesweeper may not show the whole board (i think) but
             # it makes it more fun being able to see the whole thing. no harm.
-            for r, c in self.mines:
-                if (r, c) not in self.flags:  # if mine was flagged
-                    button = self.buttons[r][c]
-                    button.config(bg=UNCLICKED_COLOR)
-                    self.draw_mine(button)  # if it wasn't flagged, draw a mine in the place
-                # if it was flagged, it's already indicated as such, so we don't change it
-            for row in range(GRID_HEIGHT):
-                for col in range(GRID_WIDTH):
-                    if (row, col) not in self.mines:
-                        self.reveal_cell(row, col)  # show numbers on non-mine cells
+            self.reveal_board()
         else:
             # if we won without flags, flag all unflagged mines
-            for r, c in self.mines:
-                if (r, c) not in self.flags:
-                    button = self.buttons[r][c]
-                    button.config(bg="#666666")  # TODO: move to top constants
-                    self.draw_flag(button)  
-            self.update_flag_counter(MINES_COUNT)  # update flag counter to x/x
+            for index in self.board.mine_indices():
+                if not self.board.flags[index]:
+                    r, c = divmod(index, self.width)
+                    self.set_cell_color(r, c, "#666666")  # TODO: move to top constants
+                    self.draw_flag(r, c)
+            self.update_flag_counter(self.mines_count)  # update flag counter to x/x
 
         if win:
             end_time = time.time()
             time_taken = end_time - self.start_time
-            self.store_win_record(time_taken)
+            if self.replay_events is None:  # a replayed win was already recorded the first time
+                self.store_win_record(time_taken)
             # see, i want to move away from messagebox but i'm not sure what a better
             # way to give info to the user is
             # maybe i could put something in the top titlebar instead
             # then make it return to the menu on confirmation so we have a loop
             # for now this works
-            messagebox.showinfo("Minesweeper", "Congratulations! You've won!")
+            three_bv = self.board.three_bv()
+            message = (f"Congratulations! You've won!\n\n3BV: {three_bv}   3BV/s: {three_bv / max(time_taken, 0.01):.2f}"
+                       f"   Efficiency: {three_bv / max(self.clicks, 1):.0%}")
         else:
-            messagebox.showinfo("Minesweeper", "Game Over! You hit a mine.")
+            message = "Game Over! You hit a mine."
+        if self.race is not None:
+            # the other boards are still going
+            messagebox.showinfo("Minesweeper", f"Board {self.race}: {message}")
+            return
+        messagebox.showinfo("Minesweeper", message)
         self.master.destroy()
 
+    def reveal_board(self):
+        # everything that's left in one go: unflagged mines get drawn (flagged ones are
+        # already indicated as such), every other cell is opened without any flood fills
+        board = self.board
+        cells = [i for i in board.mine_indices() if not board.flags[i]] + board.reveal_all()
+        if not ENDGAME_WAVE or board.exploded is None:
+            for index in cells:
+                self.draw_endgame_cell(index)
+            return
+        # group the cells into square rings around the mine that was hit, and let one
+        # timer draw a few rings per frame
+        origin_row, origin_col = divmod(board.exploded, self.width)
+        rings = {}
+        for index in cells:
+            row, col = divmod(index, self.width)
+            rings.setdefault(max(abs(row - origin_row), abs(col - origin_col)), []).append(index)
+        self.wave = [rings[distance] for distance in sorted(rings)]
+        self.wave_step = -(-len(self.wave) // WAVE_FRAMES)  # rings per frame, rounded up
+        self.advance_wave()
+
+    def advance_wave(self):
+        if self.wave_task is not None:
+            self.scheduled_tasks.remove(self.wave_task)
+            self.wave_task = None
+        for ring in self.wave[:self.wave_step]:
+            for index in ring:
+                self.draw_endgame_cell(index)
+        del self.wave[:self.wave_step]
+        if self.wave:
+            self.wave_task = self.master.after(FRAME_MS, self.advance_wave)
+            self.scheduled_tasks.append(self.wave_task)
+
+    def draw_endgame_cell(self, index):
+        if self.board.mines[index]:
+            row, col = divmod(index, self.width)
+            self.set_cell_color(row, col, UNCLICKED_COLOR)
+            self.draw_mine(row, col)
+        else:
+            self.fading.pop(index, None)
+            self.canvas.itemconfig(self.cell_item(index), fill=CLICKED_COLOR)
+            self.draw_number(index)
+
     def store_win_record(self, time_taken):
         # the only real reason i'm using struct here is because this project was
         # primarily made for some friends. and i know for a fact they'd end up
         # trying to change their own records smh
-        mode = f"{GRID_WIDTH}x{GRID_HEIGHT} - {MINES_COUNT} Mines"
-        mode_encoded = mode.encode('utf-8')  # encode the mode string as bytes
-        record = struct.pack('I', len(mode_encoded)) + mode_encoded + struct.pack('f', time_taken)
-        # 'I' is for unsigned int (length of the mode string), 'f' is for float (time_taken)
-        with open("minesweeper.wins", "ab") as file:
-            file.write(record)
+        ScoreStore().add(ScoreStore.mode_name(self.width, self.height, self.mines_count), time_taken, self.board.three_bv(), self.clicks)
+
+    def draw_mine(self, row, col):
+        x, y = self.cell_origin(row, col)
+        self.canvas.create_image(x, y, image=self.glyphs.get("mine"), anchor="nw", tags="mine")
+
+class EndlessGame:
+    """Endless mode window, over a ChunkedBoard.
+
+    The canvas is a fixed VIEW_COLS x VIEW_ROWS window onto the board that the arrow keys
+    (or WASD) scroll around. Only the cells in view have canvas items; scrolling recolours
+    those in place, so nothing gets built for the parts of the board out of sight.
+    """
+
+    def __init__(self, master, glyphs):
+        self.master = master
+        self.glyphs = glyphs
+        self.board  = None
+        self.top    = 0      # board row/col of the view's top left cell
+        self.left   = 0
+        self.info_frame = tk.Frame(master, bg=BG_COLOR, height=CELL_SIZE)
+        self.info_frame.grid(row=0, column=0, sticky="nsew")
+        self.opened_label = tk.Label(self.info_frame, bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.5), "bold"))
+        self.opened_label.pack(side="left", padx=(10, 0))
+        self.restart_button = tk.Button(self.info_frame, text="Restart", bg=UNCLICKED_COLOR, fg=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.5), "bold"), relief="flat", command=self.new_board)
+        self.restart_button.pack(side="left", expand=True, padx=10)
+        self.position_label = tk.Label(self.info_frame, bg=BG_COLOR, fg=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.5), "bold"))
+        self.position_label.pack(side="right", padx=(0, 10))
+
+        self.canvas = tk.Canvas(master, width=VIEW_COLS * CELL_SIZE, height=VIEW_ROWS * CELL_SIZE, bg=BG_COLOR, highlightthickness=0)
+        self.canvas.grid(row=1, column=0)
+        self.cells = [
+            self.canvas.create_rectangle(col * CELL_SIZE, row * CELL_SIZE, (col + 1) * CELL_SIZE, (row + 1) * CELL_SIZE, fill=UNCLICKED_COLOR, width=0)
+            for row in range(VIEW_ROWS) for col in range(VIEW_COLS)
+        ]
+        self.canvas.bind("<Button-1>", lambda e: self.on_canvas_event(e, self.cell_click))
+        self.canvas.bind("<Button-3>", lambda e: self.on_canvas_event(e, self.place_flag))
+        for keys, rows, cols in ((("Up", "w"), -1, 0), (("Down", "s"), 1, 0), (("Left", "a"), 0, -1), (("Right", "d"), 0, 1)):
+            for key in keys:
+                master.bind(f"<KeyPress-{key}>", lambda e, r=rows, c=cols: self.scroll(r * SCROLL_STEP, c * SCROLL_STEP))
+        self.new_board()
+
+    def new_board(self, seed=None):
+        self.board = ChunkedBoard(seed)
+        self.board.watch(self.draw_cells)
+        self.top, self.left = -(VIEW_ROWS // 2), -(VIEW_COLS // 2)  # (0, 0) in the middle
+        self.render()
+        self.board.click(0, 0)  # always clear, so the game opens with it done
+
+    def on_canvas_event(self, event, handler):
+        if self.board.lost:
+            return
+        row, col = int(event.y // CELL_SIZE), int(event.x // CELL_SIZE)
+        if 0 <= row < VIEW_ROWS and 0 <= col < VIEW_COLS:
+            handler(self.top + row, self.left + col)
+
+    def scroll(self, rows, cols):
+        self.top  += rows
+        self.left += cols
+        self.render()
+
+    def render(self):
+        # every cell in view, from scratch
+        self.canvas.delete("glyph")
+        for row in range(self.top, self.top + VIEW_ROWS):
+            for col in range(self.left, self.left + VIEW_COLS):
+                self.draw_cell(row, col)
+        self.update_labels()
+
+    def draw_cells(self, cells):
+        # board watcher, only the cells that are in view need anything doing
+        for row, col in cells:
+            if self.top <= row < self.top + VIEW_ROWS and self.left <= col < self.left + VIEW_COLS:
+                self.canvas.delete(f"glyph{row}:{col}")
+                self.draw_cell(row, col)
+        self.update_labels()
+
+    def draw_cell(self, row, col):
+        board = self.board
+        view_row, view_col = row - self.top, col - self.left
+        x, y = view_col * CELL_SIZE, view_row * CELL_SIZE
+        tags = ("glyph", f"glyph{row}:{col}")
+        state = board.state(row, col)
+        if state == board.REVEALED:
+            self.canvas.itemconfig(self.cells[view_row * VIEW_COLS + view_col], fill=CLICKED_COLOR)
+            mines_count = board.adjacent_mines(row, col)
+            if mines_count:
+                self.canvas.create_text(x + CELL_SIZE//2, y + CELL_SIZE//2, text=str(mines_count), fill=NUMBER_COLORS, font=("Arial", int(CELL_SIZE/2.7), "bold"), tags=tags)
+            return
+        self.canvas.itemconfig(self.cells[view_row * VIEW_COLS + view_col], fill=UNCLICKED_COLOR)
+        if state == board.FLAGGED:
+            self.canvas.create_image(x, y, image=self.glyphs.get("flag"), anchor="nw", tags=tags)
+        elif board.lost and board.is_mine(row, col):
+            self.canvas.create_image(x, y, image=self.glyphs.get("mine"), anchor="nw", tags=tags)
+
+    def update_labels(self):
+        self.opened_label.config(text=f"Opened: {self.board.revealed_count}")
+        self.position_label.config(text=f"{self.top + VIEW_ROWS // 2}, {self.left + VIEW_COLS // 2}")
+
+    def cell_click(self, row, col):
+        if self.board.state(row, col) == self.board.REVEALED:
+            self.board.chord(row, col)
+        else:
+            self.board.click(row, col)
+        if self.board.lost:
+            self.game_over()
 
-    def draw_mine(self, button):
-        outer_circle_radius = CELL_SIZE * 0.2  # main mine body
-        inner_circle_radius = CELL_SIZE * 0.07  # the inner circle of the same color as the cell
-        leg_size = CELL_SIZE * 0.1  # mines legs
-        
-        # Draw outer circle
-        button.create_oval(
-            CELL_SIZE/2 - outer_circle_radius, CELL_SIZE/2 - outer_circle_radius,
-            CELL_SIZE/2 + outer_circle_radius, CELL_SIZE/2 + outer_circle_radius,
-            fill=BG_COLOR, outline=BG_COLOR
-        )
-        
-        # Draw inner circle
-        button.create_oval(
-            CELL_SIZE/2 - inner_circle_radius, CELL_SIZE/2 - inner_circle_radius,
-            CELL_SIZE/2 + inner_circle_radius, CELL_SIZE/2 + inner_circle_radius,
-            fill=UNCLICKED_COLOR, outline=UNCLICKED_COLOR
-        )
-        
-        # calculate and draw legs at every 45 degrees around the outer circle
-        for angle in range(0, 360, 45):
-            radian = angle * (3.141592653589793 / 180)  # angle -> radians
-            # getting the center position for each leg
-            x_center = CELL_SIZE/2 + (outer_circle_radius + leg_size/2) * math.cos(radian)
-            y_center = CELL_SIZE/2 + (outer_circle_radius + leg_size/2) * math.sin(radian)
-            # getting the top-left corner based on the center position
-            x = x_center - leg_size/2
-            y = y_center - leg_size/2
-            button.create_rectangle(
-                x, y, x + leg_size, y + leg_size,
-                fill=BG_COLOR, outline=BG_COLOR
-            )
-
-def main():
+    def place_flag(self, row, col):
+        self.board.toggle_flag(row, col)
+
+    def game_over(self):
+        self.render()  # shows the mines in view
+        messagebox.showinfo("Minesweeper", f"Game Over! You hit a mine after opening {self.board.revealed_count} cells.")
+        self.master.destroy()
+
+
+# ---- HEADLESS
+STRATEGIES = ("odds", "logic", "random")  # see simulate_game
+
+
+def simulate_game(job):
+    """Plays one game with no window. job is (width, height, mines, strategy, seed).
+
+    First click is always the middle cell. "logic" and "odds" play every move the
+    solver is sure of, and when stuck "odds" guesses the cell least likely to be a
+    mine while "logic" guesses at random. "random" only ever guesses.
+    Returns (won, clicks, guesses, seconds).
+    """
+    width, height, mines, strategy, seed = job
+    start = time.perf_counter()
+    board = Board(width, height, mines, seed=seed)
+    rng = random.Random(seed)
+    solver = Solver(board) if strategy != "random" else None
+    board.click(height // 2, width // 2)
+    clicks, guesses = 1, 0
+    while not board.lost and not board.check_win():
+        safe = solver.find_moves()[0] if solver else ()
+        if safe:
+            for index in safe:
+                if not board.revealed[index]:
+                    board.click(*divmod(index, width))
+                    clicks += 1
+            continue
+        if strategy == "odds":
+            probabilities = solver.probabilities()
+            guess = min(probabilities, key=probabilities.get)
+        else:
+            found = solver.found if solver else ()
+            guess = rng.choice([i for i in range(board.size) if not board.revealed[i] and i not in found])
+        board.click(*divmod(guess, width))
+        clicks += 1
+        guesses += 1
+    return board.check_win(), clicks, guesses, time.perf_counter() - start
+
+
+def parse_size(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def parse_seeds(text):
+    # "1000" is seeds 0-999, "500:1000" is seeds 500-999
+    start, _, stop = text.rpartition(":")
+    return range(int(start or 0), int(stop))
+
+
+def simulate(args):
+    width, height = args.size
+    try:
+        Board(width, height, args.mines)  # bad sizes/mine counts fail here instead of in every worker
+    except ValueError as error:
+        sys.exit(f"simulate: {error}")
+    jobs = ((width, height, args.mines, args.strategy, seed) for seed in args.seeds)
+    games = wins = clicks = guesses = 0
+    game_seconds = 0.0
+    started = last_report = time.perf_counter()
+
+    def report():
+        elapsed = time.perf_counter() - started
+        print(f"{games} games  win rate {wins / games:.2%}  clicks {clicks / games:.1f}  guesses {guesses / games:.2f}"
+              f"  {game_seconds / games * 1000:.2f}ms/game  {games / elapsed:.0f} games/s", flush=True)
+
+    import multiprocessing
+    with multiprocessing.Pool(args.workers) as pool:
+        for won, game_clicks, game_guesses, seconds in pool.imap_unordered(simulate_game, jobs, chunksize=args.chunk):
+            games += 1
+            wins += won
+            clicks += game_clicks
+            guesses += game_guesses
+            game_seconds += seconds
+            if time.perf_counter() - last_report >= args.every:
+                report()
+                last_report = time.perf_counter()
+    if games:
+        report()
+
+
+def replay(args):
+    if not args.instant:
+        if len(args.files) > 1:
+            sys.exit("replay: the window plays one file at a time, use --instant for several")
+        root = create_root()
+        game = Minesweeper(root)
+        try:
+            game.play_replay(args.files[0], args.speed)
+        except (OSError, ValueError) as error:
+            root.destroy()
+            game.pool.close()
+            sys.exit(f"replay: {error}")
+        root.mainloop()
+        game.pool.close()
+        return
+    # one file at a time, so batches of any size run in constant memory
+    for path in args.files:
+        try:
+            board, seconds, inputs = replay_game(path)
+        except (OSError, ValueError) as error:
+            print(f"{path}: {error}")
+            continue
+        result = "won" if board.check_win() else "lost" if board.lost else "unfinished"
+        print(f"{path}: {board.width}x{board.height} {board.mines_count} mines, {result} in {seconds:.2f}s, {inputs} inputs")
+
+
+# ---- SERVER
+class ServerSession:
+    """The games of one client connection, and the line protocol they're played over.
+
+    Every request is one line of space separated words, every reply is one line too:
+
+        new WIDTH HEIGHT MINES [SEED]   ->  ok ID
+        click|chord|flag ID ROW COL     ->  ok STATUS ROW,COL,CELL ...  (only the cells that changed)
+        state ID                        ->  ok STATUS WIDTH HEIGHT CELLS  (every cell, row by row)
+        close ID                        ->  ok
+
+    STATUS is playing, won or lost. CELL is the number for a revealed cell, F for a flag,
+    # for a hidden cell and * for the mine that was hit. Anything wrong gets "err REASON".
+    The moves are the same ones the window makes, straight on a Board. Boards go up to
+    SERVER_MAX_CELLS cells, since every move blocks the other clients while it runs.
+    """
+    COMMANDS = {  # name -> (min args, max args)
+        "new":   (3, 4),
+        "click": (3, 3),
+        "chord": (3, 3),
+        "flag":  (3, 3),
+        "state": (1, 1),
+        "close": (1, 1),
+    }
+
+    def __init__(self):
+        self.games   = {}  # id -> Board
+        self.next_id = 1
+        self.changed = []  # indices the current move touched, filled by the boards' watchers
+
+    def handle(self, line):
+        parts = line.split()
+        if not parts:
+            return "err empty line"
+        command, args = parts[0], parts[1:]
+        if command not in self.COMMANDS:
+            return f"err unknown command {command}"
+        least, most = self.COMMANDS[command]
+        if not least <= len(args) <= most:
+            return f"err {command} takes {least} to {most} numbers" if least != most else f"err {command} takes {least} numbers"
+        try:
+            return getattr(self, f"do_{command}")(*map(int, args))
+        except ValueError as error:
+            return f"err {error}"
+
+    def game(self, game_id):
+        board = self.games.get(game_id)
+        if board is None:
+            raise ValueError(f"no game {game_id}")
+        return board
+
+    @staticmethod
+    def status(board):
+        return "lost" if board.lost else "won" if board.check_win() else "playing"
+
+    @staticmethod
+    def cell(board, index):
+        if board.revealed[index]:
+            return str(board.counts[index])
+        if index == board.exploded:
+            return "*"
+        return "F" if board.flags[index] else "#"
+
+    def do_new(self, width, height, mines, seed=None):
+        if width * height > SERVER_MAX_CELLS:
+            raise ValueError(f"boards go up to {SERVER_MAX_CELLS} cells")
+        board = Board(width, height, mines, seed=seed)
+        board.watch(self.changed.extend)
+        game_id, self.next_id = self.next_id, self.next_id + 1
+        self.games[game_id] = board
+        return f"ok {game_id}"
+
+    def move(self, game_id, row, col, action):
+        board = self.game(game_id)
+        if not (0 <= row < board.height and 0 <= col < board.width):
+            raise ValueError(f"{row},{col} is off the board")
+        if board.lost or board.check_win():
+            raise ValueError("game is over")
+        self.changed.clear()
+        action(row, col)
+        changed = self.changed + [board.exploded] if board.lost else self.changed
+        width = board.width
+        return " ".join([f"ok {self.status(board)}"] + [f"{i // width},{i % width},{self.cell(board, i)}" for i in changed])
+
+    def do_click(self, game_id, row, col):
+        return self.move(game_id, row, col, self.game(game_id).click)
+
+    def do_chord(self, game_id, row, col):
+        return self.move(game_id, row, col, self.game(game_id).chord)
+
+    def do_flag(self, game_id, row, col):
+        return self.move(game_id, row, col, self.game(game_id).toggle_flag)
+
+    def do_state(self, game_id):
+        board = self.game(game_id)
+        cells = "".join(self.cell(board, index) for index in range(board.size))
+        return f"ok {self.status(board)} {board.width} {board.height} {cells}"
+
+    def do_close(self, game_id):
+        self.game(game_id)
+        del self.games[game_id]
+        return "ok"
+
+
+async def serve_client(reader, writer):
+    session = ServerSession()
+    try:
+        while line := await reader.readline():
+            writer.write(session.handle(line.decode("ascii", "replace")).encode() + b"\n")
+            await writer.drain()
+    except (ConnectionError, ValueError):  # ValueError: line over the stream limit
+        pass
+    finally:
+        writer.close()
+
+
+async def open_server(args):
+    import asyncio
+    if args.unix:
+        if os.path.exists(args.unix) and stat.S_ISSOCK(os.stat(args.unix).st_mode):
+            os.remove(args.unix)  # left behind by a server that got killed
+        return await asyncio.start_unix_server(serve_client, args.unix)
+    return await asyncio.start_server(serve_client, args.host, args.port)
+
+
+def serve(args):
+    import asyncio
+
+    async def run():
+        server = await open_server(args)
+        print(f"serving on {args.unix or f'{args.host}:{args.port}'}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+async def loadgen_connection(args, stats, deadline):
+    # plays args.games games at once over one connection, one move per game per round,
+    # all sent together before the replies are read back (they come back in order)
+    import asyncio
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    width, height = args.size
+    rng = random.Random()
+    games = [None] * args.games  # [id, cells left to click in order, opened] per slot, None = needs a new game
+    closing = []  # ids of games that finished last round
+    while time.perf_counter() < deadline:
+        requests = [f"close {game_id}" for game_id in closing]
+        for slot, game in enumerate(games):
+            if game is None:
+                requests.append(f"new {width} {height} {args.mines}")
+                continue
+            order, opened = game[1], game[2]
+            while order[-1] in opened:
+                order.pop()
+            index = order.pop()
+            requests.append(f"click {game[0]} {index // width} {index % width}")
+        writer.write(("\n".join(requests) + "\n").encode())
+        await writer.drain()
+        for _ in closing:
+            await reader.readline()
+            stats["requests"] += 1
+        closing.clear()
+        for slot, game in enumerate(games):
+            reply = (await reader.readline()).decode().split()
+            stats["requests"] += 1
+            if reply[0] != "ok":
+                raise RuntimeError(f"server said: {' '.join(reply)}")
+            if game is None:
+                order = list(range(width * height))
+                rng.shuffle(order)
+                games[slot] = [int(reply[1]), order, set()]
+                continue
+            opened = game[2]
+            for cell in reply[2:]:
+                row, col, _ = cell.split(",")
+                opened.add(int(row) * width + int(col))
+            if reply[1] != "playing":
+                stats["games"] += 1
+                stats["wins"] += reply[1] == "won"
+                closing.append(game[0])
+                games[slot] = None
+    writer.close()
+
+
+def loadgen(args):
+    import asyncio
+
+    try:
+        Board(*args.size, args.mines)
+    except ValueError as error:
+        sys.exit(f"loadgen: {error}")
+    stats = {"requests": 0, "games": 0, "wins": 0}
+
+    async def run():
+        started = time.perf_counter()
+        deadline = started + args.seconds
+
+        async def report():
+            while True:
+                await asyncio.sleep(args.every)
+                elapsed = time.perf_counter() - started
+                print(f"{stats['requests']} requests  {stats['requests'] / elapsed:.0f}/s  {stats['games']} games finished", flush=True)
+
+        reporter = asyncio.create_task(report())
+        try:
+            await asyncio.gather(*(loadgen_connection(args, stats, deadline) for _ in range(args.connections)))
+        finally:
+            reporter.cancel()
+        elapsed = time.perf_counter() - started
+        print(f"{stats['requests']} requests in {elapsed:.1f}s, {stats['requests'] / elapsed:.0f}/s, "
+              f"{args.connections * args.games} games at once, {stats['games']} finished ({stats['wins']} won)")
+
+    try:
+        asyncio.run(run())
+    except (OSError, RuntimeError) as error:
+        sys.exit(f"loadgen: {error}")
+
+
+def add_address_arguments(parser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="use a unix socket at PATH instead of TCP")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Minesweeper. Runs the game window when no command is given.")
+    parser.add_argument("--debug", action="store_true", help="show handler timings, pending timers and frame times under the board")
+    parser.add_argument("--trace", metavar="FILE", help="record handler and frame timings to FILE (Chrome trace JSON, opens in Perfetto)")
+    commands = parser.add_subparsers(dest="command")
+
+    sim_parser = commands.add_parser("simulate", help="play lots of games headless and print win rate statistics")
+    sim_parser.add_argument("--size", type=parse_size, default=(30, 16), help="board size as WIDTHxHEIGHT (default 30x16)")
+    sim_parser.add_argument("--mines", type=int, default=99)
+    sim_parser.add_argument("--strategy", choices=STRATEGIES, default="odds")
+    sim_parser.add_argument("--seeds", type=parse_seeds, default=range(1000), help="N or START:STOP (default 1000)")
+    sim_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to play on (default: all cores)")
+    sim_parser.add_argument("--chunk", type=int, default=32, help="games handed to a worker at a time")
+    sim_parser.add_argument("--every", type=float, default=1.0, help="seconds between progress lines")
+    sim_parser.set_defaults(run=simulate)
+
+    replay_parser = commands.add_parser("replay", help="play back recorded games from the replays folder")
+    replay_parser.add_argument("files", nargs="+", help="replay files, only one unless --instant is given")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="playback speed in the window, 2 is twice as fast (default 1)")
+    replay_parser.add_argument("--instant", action="store_true", help="no window, just run every file through the engine and print the results")
+    replay_parser.set_defaults(run=replay)
+
+    serve_parser = commands.add_parser("serve", help="host headless games for bots over a line based socket protocol")
+    add_address_arguments(serve_parser)
+    serve_parser.set_defaults(run=serve)
+
+    load_parser = commands.add_parser("loadgen", help="hammer a running server with random games and print requests/s")
+    add_address_arguments(load_parser)
+    load_parser.add_argument("--connections", type=int, default=20)
+    load_parser.add_argument("--games", type=int, default=50, help="games played at once on each connection (default 50)")
+    load_parser.add_argument("--size", type=parse_size, default=(30, 16), help="board size as WIDTHxHEIGHT (default 30x16)")
+    load_parser.add_argument("--mines", type=int, default=99)
+    load_parser.add_argument("--seconds", type=float, default=10)
+    load_parser.add_argument("--every", type=float, default=1.0, help="seconds between progress lines")
+    load_parser.set_defaults(run=loadgen)
+    return parser
+
+
+def load_tk():
+    """Imports tkinter and messagebox into the module the first time a window is needed."""
+    global tk, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import messagebox as tk_messagebox
+        tk, messagebox = tkinter, tk_messagebox
+    return tk
+
+
+def create_root():
+    load_tk()
     root = tk.Tk()
     root.title("Minesweeper")
     root.resizable(False, False)  # non-resizable because no point having it resizable (that i see)
@@ -535,9 +2828,21 @@ def main():
     center_y = int((screen_height - window_height) / 2)
 
     root.geometry(f'+{center_x}+{center_y}')
+    return root
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command:
+        return args.run(args)
 
-    game = Minesweeper(root)
+    tracer = Tracer(args.trace, overlay=args.debug) if args.debug or args.trace else None
+    root = create_root()
+    game = Minesweeper(root, tracer=tracer)
     root.mainloop()
+    game.pool.close()
+    if tracer:
+        tracer.save()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file